@@ -1,15 +1,27 @@
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, HARDCODED_USERNAME, HARDCODED_PASSWORD
+from config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    HARDCODED_USERNAME,
+    HARDCODED_PASSWORD,
+    VERIFIED_TOKEN_CACHE_SIZE,
+)
 from schemas.auth_schemas import User
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# token -> (exp timestamp, claims) for tokens whose signature has already been checked
+_verified_tokens: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
 
 def authenticate_user(username: str, password: str) -> bool:
     return username == HARDCODED_USERNAME and password == HARDCODED_PASSWORD
@@ -21,25 +33,50 @@ def create_access_token(subject: str, expires_delta: Optional[timedelta] = None)
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+def verify_token(token: str) -> Dict[str, Any]:
+    """
+    Decode and validate a JWT, returning its claims. Raises JWTError if invalid.
+    Verified tokens are remembered (bounded LRU) until their `exp`, so repeat
+    requests with the same token skip the HMAC check and JSON parsing.
+    """
+    now = time.time()
+    entry = _verified_tokens.get(token)
+    if entry is not None:
+        expires_at, claims = entry
+        if expires_at > now:
+            _verified_tokens.move_to_end(token)
+            return claims
+        _verified_tokens.pop(token, None)
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = claims.get("sub")
+    if not username or username != HARDCODED_USERNAME:
+        raise JWTError("Unknown subject")
+
+    expires_at = claims.get("exp")
+    if expires_at is not None:
+        _verified_tokens[token] = (float(expires_at), claims)
+        while len(_verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+    return claims
+
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)) -> User:
+    """Reuses the claims AuthMiddleware already verified for this request when the token matches."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials.",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if not username:
+    claims = request.scope.get("auth_claims") if request.scope.get("auth_token") == token else None
+    if claims is None:
+        try:
+            claims = verify_token(token)
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    if username != HARDCODED_USERNAME:
-        raise credentials_exception
-    return User(username=username)
+    return User(username=claims["sub"])
 
 
-async def get_current_username(token: str = Depends(oauth2_scheme)) -> str:
+async def get_current_username(user: User = Depends(get_current_user)) -> str:
     """Dependency returning only the username string (useful for per-user caching)."""
-    user = await get_current_user(token)
     return user.username
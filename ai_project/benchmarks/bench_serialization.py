@@ -0,0 +1,87 @@
+"""
+Micro-benchmark: CPU cost of turning one page of records into response bytes.
+
+    cd ai_project && python -m benchmarks.bench_serialization [--rows 100] [--repeat 2000]
+
+"before" is the path GET /records/ used to take: ORM objects validated into RecordOut via
+from_attributes, jsonable_encoder + stdlib json for the response, and fastapi_cache's JsonCoder
+encoding the result again for storage (a hit decoded and re-validated it).
+"after" is the current path: rows projected straight to dicts, encoded once with utils.json_utils.dumps;
+a hit serves the cached bytes as they are. No database is involved, only serialization.
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache.coder import JsonCoder
+from pydantic import TypeAdapter
+
+from models.record_model import OptionType, Record, StatusType
+from schemas.record_schemas import RecordOut
+from services.record_service import record_to_dict
+from utils.json_utils import dumps, orjson
+
+_page_adapter = TypeAdapter(List[RecordOut])
+
+
+def make_records(n: int) -> List[Record]:
+    start = datetime(2024, 1, 1)
+    return [
+        Record(
+            id=i,
+            created_at=start + timedelta(seconds=i),
+            option_type=OptionType.SEARCH if i % 2 else OptionType.OPPORTUNITY,
+            description=f"Record {i}: data quality checks for the nightly ETL load",
+            status=StatusType.ACTIVE,
+        )
+        for i in range(n)
+    ]
+
+
+def before_miss(records: List[Record]) -> bytes:
+    items = _page_adapter.validate_python(records, from_attributes=True)
+    stored = JsonCoder.encode(items)  # fastapi_cache storing the endpoint result
+    body = json.dumps(jsonable_encoder({"items": items, "next_cursor": None})).encode()  # response rendering
+    return stored + body
+
+
+def before_hit(stored: bytes) -> bytes:
+    items = _page_adapter.validate_python(JsonCoder.decode(stored))
+    return json.dumps(jsonable_encoder({"items": items, "next_cursor": None})).encode()
+
+
+def after_miss(records: List[Record]) -> bytes:
+    return dumps({"items": [record_to_dict(r) for r in records], "next_cursor": None})
+
+
+def after_hit(stored: bytes) -> bytes:
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=100, help="records per page")
+    parser.add_argument("--repeat", type=int, default=2000, help="iterations per measurement")
+    args = parser.parse_args()
+
+    records = make_records(args.rows)
+    before_stored = JsonCoder.encode(_page_adapter.validate_python(records, from_attributes=True))
+    after_stored = after_miss(records)
+    assert json.loads(after_stored) == json.loads(before_hit(before_stored)), "paths must produce the same JSON"
+
+    cases = [
+        ("miss", lambda: before_miss(records), lambda: after_miss(records)),
+        ("hit", lambda: before_hit(before_stored), lambda: after_hit(after_stored)),
+    ]
+    print(f"{args.rows} rows/page, {args.repeat} iterations, encoder={'orjson' if orjson else 'stdlib json'}")
+    for name, before, after in cases:
+        before_us = min(timeit.repeat(before, number=args.repeat, repeat=3)) / args.repeat * 1e6
+        after_us = min(timeit.repeat(after, number=args.repeat, repeat=3)) / args.repeat * 1e6
+        print(f"{name:>5}: before {before_us:9.1f} us   after {after_us:9.1f} us   speedup {before_us / after_us:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
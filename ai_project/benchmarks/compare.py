@@ -0,0 +1,80 @@
+"""
+Compare two benchmark reports written by benchmarks.run, scenario by scenario and per operation.
+
+    cd ai_project && python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Exits with status 1 when any throughput drops, or p50/p99 latency rises, by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+# (label, path into a summary, True when higher is better)
+_FIELDS = (
+    ("req/s", ("throughput_rps",), True),
+    ("p50 ms", ("latency_ms", "p50"), False),
+    ("p99 ms", ("latency_ms", "p99"), False),
+    ("ttfb p50 ms", ("ttfb_ms", "p50"), False),
+)
+
+
+def _get(summary: Dict[str, Any], path: Tuple[str, ...]) -> Optional[float]:
+    for part in path:
+        if not isinstance(summary, dict) or part not in summary:
+            return None
+        summary = summary[part]
+    return summary
+
+
+def _rows(name: str, before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> Tuple[List[str], int]:
+    rows, regressions = [], 0
+    for label, path, higher_is_better in _FIELDS:
+        old, new = _get(before, path), _get(after, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif -worse > threshold:
+            flag = "  improved"
+        rows.append(f"{name:<36} {label:<12} {old:>11.2f} {new:>11.2f} {change:>+8.1f}%{flag}")
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change reported as a regression")
+    args = parser.parse_args()
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    print(f"{'scenario / operation':<36} {'metric':<12} {'before':>11} {'after':>11} {'change':>9}")
+    regressions = 0
+    for scenario, old in before["scenarios"].items():
+        new = after["scenarios"].get(scenario)
+        if new is None:
+            continue
+        rows, count = _rows(scenario, old, new, args.threshold)
+        regressions += count
+        operations = old.get("operations", {})
+        for op, old_op in operations.items() if len(operations) > 1 else ():
+            new_op = new.get("operations", {}).get(op)
+            if new_op is not None:
+                op_rows, _ = _rows(f"  {op}", old_op, new_op, args.threshold)
+                rows += op_rows
+        print("\n".join(rows))
+    # only scenario totals gate the exit status; per-operation rows are for reading
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Closed-loop HTTP load generator and latency summaries shared by the benchmark scenarios."""
+import asyncio
+import math
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+# one operation: performs a request and returns (operation name, HTTP status, time to first byte or None)
+Op = Callable[[httpx.AsyncClient, random.Random], Awaitable[Tuple[str, int, Optional[float]]]]
+
+
+@dataclass
+class Sample:
+    op: str
+    status: int  # 0 = transport error or timeout
+    seconds: float
+    ttfb: Optional[float] = None
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values), max(1, math.ceil(q / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
+
+
+def _latency_ms(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p90": round(percentile(values, 90) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "max": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+def _summary(samples: List[Sample], wall: float) -> Dict[str, Any]:
+    statuses: Dict[str, int] = defaultdict(int)
+    for sample in samples:
+        statuses[str(sample.status)] += 1
+    errors = sum(1 for s in samples if s.status == 0 or s.status >= 500)
+    summary = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / wall, 2) if wall > 0 else 0.0,
+        "status": dict(sorted(statuses.items())),
+        "latency_ms": _latency_ms([s.seconds for s in samples]),
+    }
+    ttfb = [s.ttfb for s in samples if s.ttfb is not None]
+    if ttfb:
+        summary["ttfb_ms"] = _latency_ms(ttfb)
+    return summary
+
+
+def summarize(samples: List[Sample], wall: float) -> Dict[str, Any]:
+    """Totals over all samples plus the same figures per operation."""
+    by_op: Dict[str, List[Sample]] = defaultdict(list)
+    for sample in samples:
+        by_op[sample.op].append(sample)
+    return {
+        **_summary(samples, wall),
+        "wall_seconds": round(wall, 3),
+        "operations": {op: _summary(op_samples, wall) for op, op_samples in sorted(by_op.items())},
+    }
+
+
+async def closed_loop(
+    client: httpx.AsyncClient,
+    pick: Callable[[random.Random], Op],
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    `concurrency` workers each send one request at a time, back to back, for `warmup + duration`
+    seconds; only requests started after the warmup are recorded. `pick` chooses each worker's next op.
+    """
+    samples: List[Sample] = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    record_from = started + warmup
+    deadline = record_from + duration
+
+    async def worker(index: int) -> None:
+        rng = random.Random(f"{seed}-{index}")
+        while loop.time() < deadline:
+            op = pick(rng)
+            begin = time.perf_counter()
+            recorded = loop.time() >= record_from
+            try:
+                name, status, ttfb = await op(client, rng)
+            except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                if recorded:
+                    samples.append(Sample(f"{op.__name__}:{type(e).__name__}", 0, time.perf_counter() - begin))
+                continue
+            if recorded:
+                samples.append(Sample(name, status, time.perf_counter() - begin, ttfb))
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(samples, loop.time() - record_from)
@@ -0,0 +1,92 @@
+"""
+Mock Ollama server for benchmarks: streams /api/generate as NDJSON, like Ollama, at a fixed
+token rate after a configurable time to first token, so Q&A scenarios measure the app and not a GPU.
+
+    cd ai_project && python -m benchmarks.mock_ollama --port 11500 --tokens 200 --token-rate 50 --first-token-ms 300
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+_WORDS = ["Question", "answer", "SQL", "validation", "pipeline", "quality", "test", "data", "ETL", "report"]
+
+
+def create_app(
+    tokens: int = 200, token_rate: float = 50.0, first_token_ms: float = 300.0, jitter: float = 0.1,
+    fail_after: Optional[int] = None,
+) -> Starlette:
+    """
+    `jitter` is the relative spread applied to every delay (0.1 = +/-10%). With `fail_after`, every
+    generation drops the connection after that many tokens, like an Ollama host dying mid-stream.
+    """
+
+    def delay(seconds: float) -> float:
+        return max(0.0, seconds * random.uniform(1 - jitter, 1 + jitter))
+
+    def line(**fields) -> str:
+        return json.dumps({"created_at": datetime.now(timezone.utc).isoformat(), **fields}) + "\n"
+
+    async def generate(request: Request):
+        body = await request.json()
+        model = body.get("model", "llama3")
+
+        async def stream():
+            started = time.perf_counter_ns()
+            await asyncio.sleep(delay(first_token_ms / 1000))
+            for i in range(tokens):
+                if i == fail_after:
+                    raise ConnectionError("mock Ollama: dropping the stream")
+                if i:
+                    await asyncio.sleep(delay(1 / token_rate))
+                yield line(model=model, response=random.choice(_WORDS) + " ", done=False)
+            yield line(
+                model=model, response="", done=True, done_reason="stop", eval_count=tokens,
+                prompt_eval_count=len(body.get("prompt", "")) // 4, total_duration=time.perf_counter_ns() - started,
+            )
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    async def tags(request: Request):
+        return JSONResponse({"models": [{"name": "llama3:latest", "model": "llama3:latest"}]})
+
+    async def version(request: Request):
+        return JSONResponse({"version": "0.0.0-mock"})
+
+    async def root(request: Request):
+        return PlainTextResponse("Ollama is running")
+
+    return Starlette(routes=[
+        Route("/", root),
+        Route("/api/generate", generate, methods=["POST"]),
+        Route("/api/tags", tags),
+        Route("/api/version", version),
+    ])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--tokens", type=int, default=200, help="tokens per generation")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="tokens per second per generation")
+    parser.add_argument("--first-token-ms", type=float, default=300.0, help="delay before the first token")
+    parser.add_argument("--jitter", type=float, default=0.1, help="relative spread of every delay")
+    parser.add_argument("--fail-after", type=int, help="drop every stream after this many tokens")
+    args = parser.parse_args()
+    app = create_app(args.tokens, args.token_rate, args.first_token_ms, args.jitter, args.fail_after)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Load-test the API end to end: start the app (uvicorn, fresh databases in a temp dir) against the
+mock Ollama server, run the standard scenarios and write a JSON report to compare across commits.
+
+    cd ai_project && python -m benchmarks.run [--scenarios records_read,qa_concurrent] [--duration 20]
+    python -m benchmarks.compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+
+Pass --app-url to load an app that is already running (no mock, no seeding of a fresh DB).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.load import closed_loop
+from benchmarks.scenarios import SCENARIOS, BenchContext, weighted
+from config import HARDCODED_PASSWORD, HARDCODED_USERNAME
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_DIR, "benchmarks", "results")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], cwd=PROJECT_DIR, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout.strip() if out.returncode == 0 else None
+
+
+def _start(args: List[str], cwd: str, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "ab")
+    return subprocess.Popen([sys.executable, *args], cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def _stop(process: Optional[subprocess.Popen]) -> None:
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def _wait_ready(url: str, path: str, process: Optional[subprocess.Popen], timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url, timeout=2) as client:
+        while time.monotonic() < deadline:
+            if process is not None and process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+            try:
+                if (await client.get(path)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+async def run_scenarios(url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+        login = await client.post("/auth/login", data={"username": HARDCODED_USERNAME, "password": HARDCODED_PASSWORD})
+        login.raise_for_status()
+        ctx = BenchContext(login.json()["access_token"], args.resume)
+        if args.seed_records and any(name.startswith("records") for name in args.scenarios):
+            print(f"seeding {args.seed_records} records ...")
+            await ctx.seed_records(client, args.seed_records)
+
+        results: Dict[str, Any] = {}
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            concurrency = args.concurrency or scenario.concurrency
+            print(f"{name}: {scenario.description} (concurrency {concurrency}, {args.duration:.0f}s)")
+            summary = await closed_loop(
+                client, weighted(scenario.mix(ctx)), concurrency, args.duration, args.warmup, args.seed
+            )
+            results[name] = {"description": scenario.description, "concurrency": concurrency, **summary}
+            latency = summary["latency_ms"]
+            print(
+                f"  {summary['throughput_rps']:9.1f} req/s  p50 {latency['p50']:8.2f} ms  "
+                f"p99 {latency['p99']:8.2f} ms  errors {summary['errors']}/{summary['requests']}"
+            )
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3, help="unrecorded seconds before each scenario")
+    parser.add_argument("--concurrency", type=int, default=0, help="override every scenario's default")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the request mix")
+    parser.add_argument("--seed-records", type=int, default=20000, help="records created before the records scenarios")
+    parser.add_argument("--resume", default="resume.pdf", help="sample resume for Q&A (resume_long.pdf: 13 pages)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--mock-tokens", type=int, default=200)
+    parser.add_argument("--mock-token-rate", type=float, default=50.0, help="tokens/s per generation")
+    parser.add_argument("--mock-first-token-ms", type=float, default=300.0)
+    parser.add_argument("--mock-backends", type=int, default=1, help="mock Ollama servers the app spreads generations over")
+    parser.add_argument("--app-url", help="benchmark an already running app instead of starting one")
+    parser.add_argument("--out", help="report path (default benchmarks/results/<time>-<commit>.json)")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix="ai-project-bench-")
+    mocks: List[subprocess.Popen] = []
+    app = None
+    url = args.app_url
+    try:
+        if url is None:
+            mock_urls = [f"http://127.0.0.1:{_free_port()}" for _ in range(args.mock_backends)]
+            app_port = _free_port()
+            env = {**os.environ, "PYTHONPATH": PROJECT_DIR, "OLLAMA_BASE_URLS": ",".join(mock_urls)}
+            # every scenario runs as one user: lift the per-user share unless the caller set one
+            env.setdefault("ADMISSION_PER_USER_MAX", "1000")
+            for i, mock_url in enumerate(mock_urls):
+                mocks.append(_start([
+                    "-m", "benchmarks.mock_ollama", "--port", mock_url.rsplit(":", 1)[1], "--tokens", str(args.mock_tokens),
+                    "--token-rate", str(args.mock_token_rate), "--first-token-ms", str(args.mock_first_token_ms),
+                ], PROJECT_DIR, env, os.path.join(workdir, f"mock_ollama_{i}.log")))
+            # run from the temp dir: app.db, jobs.db, qa_cache.db and uploads/ are relative paths
+            app = _start([
+                "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+                "--workers", str(args.workers), "--log-level", "warning",
+            ], workdir, env, os.path.join(workdir, "app.log"))
+            url = f"http://127.0.0.1:{app_port}"
+            for mock_url, mock in zip(mock_urls, mocks):
+                asyncio.run(_wait_ready(mock_url, "/", mock))
+            asyncio.run(_wait_ready(url, "/health", app))
+        started = datetime.now(timezone.utc)
+        results = asyncio.run(run_scenarios(url, args))
+    finally:
+        _stop(app)
+        for mock in mocks:
+            _stop(mock)
+
+    commit = _git("rev-parse", "HEAD")
+    report = {
+        "meta": {
+            "started_at": started.isoformat(timespec="seconds"),
+            "commit": commit,
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "app_url": args.app_url,
+            "logs": None if args.app_url else workdir,
+            "args": {k: v for k, v in vars(args).items() if k not in ("out", "app_url")},
+        },
+        "scenarios": results,
+    }
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"{started.strftime('%Y%m%dT%H%M%SZ')}-{(commit or 'nogit')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
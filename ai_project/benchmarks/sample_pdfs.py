@@ -0,0 +1,107 @@
+"""
+Deterministic sample PDFs for the benchmarks: job descriptions and resumes with real text
+layers, so pypdf extraction does the same work it does on uploads like Data_Quality_Analyst.pdf.
+
+    cd ai_project && python -m benchmarks.sample_pdfs   # (re)writes benchmarks/data/*.pdf
+
+The Q&A scenarios also build unique JDs on the fly (jd_pdf(seed=n)) so every request misses the Q&A cache.
+"""
+import os
+import random
+from typing import List
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+_SKILLS = [
+    "SQL", "ETL testing", "data profiling", "Power BI", "data warehouse", "defect management", "Python",
+    "Informatica", "reconciliation", "data lineage", "Snowflake", "test automation", "Jira", "dbt",
+    "data governance", "root cause analysis", "regression testing", "Airflow", "stakeholder reporting",
+]
+_VERBS = ["Validated", "Designed", "Automated", "Reconciled", "Documented", "Monitored", "Reviewed", "Tested"]
+_OBJECTS = [
+    "nightly ETL loads", "source-to-target mappings", "dashboard metrics", "SCD type 2 dimensions",
+    "data quality rules", "API feeds", "financial aggregates", "customer master data",
+]
+_LINES_PER_PAGE = 48
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_pdf(pages: List[List[str]]) -> bytes:
+    """A minimal PDF 1.4 file: one Helvetica text stream per page, lines top to bottom."""
+    objects: List[bytes] = []
+    page_ids = [4 + 2 * i for i in range(len(pages))]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    for pid, lines in zip(page_ids, pages):
+        text = "".join(f"({_escape(line)}) '\n" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 56 800 Td\n{text}ET".encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {pid + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def _paginate(lines: List[str]) -> List[List[str]]:
+    return [lines[i:i + _LINES_PER_PAGE] for i in range(0, len(lines), _LINES_PER_PAGE)] or [[]]
+
+
+def jd_pdf(seed: int = 0, pages: int = 1) -> bytes:
+    rng = random.Random(f"jd-{seed}")
+    lines = [f"Data Quality Analyst (requisition {seed})", "", "Responsibilities:"]
+    while len(lines) < pages * _LINES_PER_PAGE - 8:
+        lines.append(f"- {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} using {rng.choice(_SKILLS)}.")
+    lines += ["", "Requirements:"] + [f"- {skill}" for skill in rng.sample(_SKILLS, 6)]
+    return build_pdf(_paginate(lines))
+
+
+def resume_pdf(seed: int = 0, pages: int = 2) -> bytes:
+    rng = random.Random(f"resume-{seed}")
+    lines = [f"Candidate {seed}", "Data Quality Analyst", "", "Skills: " + ", ".join(rng.sample(_SKILLS, 8)), ""]
+    year = 2024
+    while len(lines) < pages * _LINES_PER_PAGE:
+        lines += [f"{year - 2}-{year}: Analyst, Company {rng.randint(1, 99)}"]
+        lines += [f"  {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} with {rng.choice(_SKILLS)}." for _ in range(6)]
+        year -= 2
+    return build_pdf(_paginate(lines))
+
+
+SAMPLES = {
+    "jd.pdf": lambda: jd_pdf(0, pages=1),
+    "resume.pdf": lambda: resume_pdf(0, pages=2),
+    # past PDF_PARALLEL_MIN_PAGES, so extraction is split across the process pool
+    "resume_long.pdf": lambda: resume_pdf(1, pages=12),
+}
+
+
+def sample_path(name: str) -> str:
+    return os.path.join(DATA_DIR, name)
+
+
+def main():
+    os.makedirs(DATA_DIR, exist_ok=True)
+    for name, build in SAMPLES.items():
+        data = build()
+        with open(sample_path(name), "wb") as f:
+            f.write(data)
+        print(f"{sample_path(name)}: {len(data)} bytes")
+
+
+if __name__ == "__main__":
+    main()
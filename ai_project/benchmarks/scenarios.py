@@ -0,0 +1,174 @@
+"""Standard benchmark scenarios: the operations each one mixes and the load it runs at by default."""
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from benchmarks.load import Op
+from benchmarks.sample_pdfs import jd_pdf, sample_path
+from config import HARDCODED_PASSWORD, HARDCODED_USERNAME
+
+_OPTION_TYPES = ("opportunity", "search")
+_STATUSES = ("active", "inactive")
+_SEARCH_TERMS = ("etl", "dashboard", "report", "quality", "reconcil*", "nightly load")
+_DESCRIPTIONS = (
+    "nightly ETL load reconciliation report",
+    "dashboard metrics quality check",
+    "source to target mapping review",
+    "data quality report for finance",
+)
+
+
+class BenchContext:
+    """State shared by the operations of one run: auth header, known record ids, sample PDFs."""
+
+    def __init__(self, token: str, resume_name: str = "resume.pdf"):
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.record_ids: List[int] = []
+        self.created_ids: List[int] = []
+        with open(sample_path("jd.pdf"), "rb") as f:
+            self.jd = f.read()
+        with open(sample_path(resume_name), "rb") as f:
+            self.resume = f.read()
+        self._qa_seq = 0
+
+    async def seed_records(self, client: httpx.AsyncClient, count: int, batch: int = 5000) -> None:
+        """Bulk-create `count` records so read scenarios page through a realistically sized table."""
+        rng = random.Random("seed")
+        for start in range(0, count, batch):
+            ops = [
+                {"op": "create", "data": {
+                    "option_type": rng.choice(_OPTION_TYPES),
+                    "status": rng.choice(_STATUSES),
+                    "description": rng.choice(_DESCRIPTIONS) + f" #{start + i}",
+                }}
+                for i in range(min(batch, count - start))
+            ]
+            response = await client.post("/records/bulk", json={"ops": ops}, headers=self.headers, timeout=300)
+            response.raise_for_status()
+            self.record_ids += [item["id"] for item in response.json()["results"] if item["ok"]]
+
+    # -------------------- auth --------------------
+    async def login(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        response = await client.post(
+            "/auth/login", data={"username": HARDCODED_USERNAME, "password": HARDCODED_PASSWORD}
+        )
+        return "login", response.status_code, None
+
+    # -------------------- records --------------------
+    async def list_records(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        params = {"limit": 50}
+        if rng.random() < 0.5:
+            params["status"] = rng.choice(_STATUSES)
+        if rng.random() < 0.5:
+            params["option_type"] = rng.choice(_OPTION_TYPES)
+        response = await client.get("/records/", params=params, headers=self.headers)
+        return "list_records", response.status_code, None
+
+    async def get_record(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        record_id = rng.choice(self.record_ids) if self.record_ids else 1
+        response = await client.get(f"/records/{record_id}", headers=self.headers)
+        return "get_record", response.status_code, None
+
+    async def search_records(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        response = await client.get(
+            "/records/search", params={"q": rng.choice(_SEARCH_TERMS), "limit": 20}, headers=self.headers
+        )
+        return "search_records", response.status_code, None
+
+    async def cached_data(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        response = await client.get("/cached-data", headers=self.headers)
+        return "cached_data", response.status_code, None
+
+    async def create_record(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        response = await client.post("/records/", headers=self.headers, json={
+            "option_type": rng.choice(_OPTION_TYPES), "description": rng.choice(_DESCRIPTIONS),
+        })
+        if response.status_code < 300:
+            self.created_ids.append(response.json()["id"])
+        return "create_record", response.status_code, None
+
+    async def update_record(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        record_id = rng.choice(self.record_ids) if self.record_ids else 1
+        response = await client.put(
+            f"/records/{record_id}", headers=self.headers, json={"status": rng.choice(_STATUSES)}
+        )
+        return "update_record", response.status_code, None
+
+    async def delete_record(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        # only records this run created, so the seeded set that reads pick from stays intact
+        if not self.created_ids:
+            return await self.create_record(client, rng)
+        record_id = self.created_ids.pop(rng.randrange(len(self.created_ids)))
+        response = await client.delete(f"/records/{record_id}", headers=self.headers)
+        return "delete_record", response.status_code, None
+
+    # -------------------- Q&A --------------------
+    async def qa_generate(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, Optional[float]]:
+        """Streamed generation for a JD no other request used, so it misses the Q&A cache every time."""
+        self._qa_seq += 1
+        files = {
+            "resume": ("resume.pdf", self.resume, "application/pdf"),
+            "jd": ("jd.pdf", jd_pdf(seed=self._qa_seq + rng.randrange(1 << 30)), "application/pdf"),
+        }
+        started = time.perf_counter()
+        ttfb = None
+        async with client.stream(
+            "POST", "/qa/generate", params={"stream": "true"}, files=files, headers=self.headers, timeout=600
+        ) as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                # the first line only names the user; time to the first generated token
+                if ttfb is None and line.startswith('{"response"'):
+                    ttfb = time.perf_counter() - started
+                elif line.startswith('{"error"'):
+                    status = 502  # Ollama failed after the 200 was sent
+        return "qa_generate", status, ttfb
+
+    async def qa_generate_cached(self, client: httpx.AsyncClient, rng: random.Random) -> Tuple[str, int, None]:
+        files = {
+            "resume": ("resume.pdf", self.resume, "application/pdf"),
+            "jd": ("jd.pdf", self.jd, "application/pdf"),
+        }
+        response = await client.post("/qa/generate", files=files, headers=self.headers, timeout=600)
+        return "qa_generate_cached", response.status_code, None
+
+
+def weighted(ops: Sequence[Tuple[Op, float]]) -> Callable[[random.Random], Op]:
+    choices = [op for op, _ in ops]
+    weights = [weight for _, weight in ops]
+    return lambda rng: rng.choices(choices, weights)[0]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    concurrency: int
+    mix: Callable[[BenchContext], Sequence[Tuple[Op, float]]]
+
+
+SCENARIOS: Dict[str, Scenario] = {s.name: s for s in (
+    Scenario("login", "POST /auth/login only", 16, lambda ctx: [(ctx.login, 1)]),
+    Scenario(
+        "records_read", "read-heavy: paged lists with filters, by-id reads, search, /cached-data", 32,
+        lambda ctx: [(ctx.list_records, 50), (ctx.get_record, 30), (ctx.search_records, 10), (ctx.cached_data, 10)],
+    ),
+    Scenario(
+        "records_mixed", "70% reads, 30% creates/updates/deletes (each write evicts cached pages)", 32,
+        lambda ctx: [
+            (ctx.list_records, 40), (ctx.get_record, 25), (ctx.search_records, 5),
+            (ctx.create_record, 12), (ctx.update_record, 12), (ctx.delete_record, 6),
+        ],
+    ),
+    Scenario(
+        "qa_concurrent", "concurrent streamed /qa/generate, every request a Q&A cache miss", 8,
+        lambda ctx: [(ctx.qa_generate, 1)],
+    ),
+    Scenario(
+        "qa_cached", "/qa/generate for one JD + resume pair: PDF upload, extraction and a Q&A cache hit", 8,
+        lambda ctx: [(ctx.qa_generate_cached, 1)],
+    ),
+)}
@@ -11,8 +11,126 @@ CACHE_BACKEND = "memory"
 
 REDIS_URL = "redis://localhost:6379/0"
 SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
+# Records routes use an AsyncSession (aiosqlite/asyncpg) unless DB_ASYNC=0, which runs the sync engine in the threadpool
+DB_ASYNC: bool = os.getenv("DB_ASYNC", "1").lower() not in ("0", "false", "no")
+ASYNC_DATABASE_URL: str = os.getenv(
+    "ASYNC_DATABASE_URL",
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1).replace(
+        "postgresql://", "postgresql+asyncpg://", 1
+    ),
+)
+# SQLite connection profile, applied to every new connection (sync and async engines).
+# WAL lets readers run alongside the writer; synchronous=NORMAL is durable across app crashes in WAL mode
+# and only fsyncs at checkpoints. cache_size is negative KiB (-65536 = 64 MiB).
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "wal"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "normal"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "memory"),
+}
+# Connection pool for file-backed SQLite (each connection keeps its own page cache and mmap)
+DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Schema changes run via `python -m migrate`; workers only compare the schema version at startup and,
+# with DB_AUTO_MIGRATE on (handy for local runs), apply a missing migration themselves under a DB lock
+DB_AUTO_MIGRATE: bool = os.getenv("DB_AUTO_MIGRATE", "1").lower() not in ("0", "false", "no")
+# Startup report (GET /health/startup): a warning is logged when worker boot takes longer than this
+STARTUP_TARGET_MS: float = float(os.getenv("STARTUP_TARGET_MS", "1500"))
 LOG_LEVEL = "INFO"
+# Response bodies larger than this are not logged; only JSON bodies are captured at all
+LOG_BODY_MAX_BYTES: int = int(os.getenv("LOG_BODY_MAX_BYTES", "4096"))
+# Per path-prefix request log sampling, e.g. LOG_SAMPLE_RATES="/health=0,/records=0.1" (unlisted paths: 1.0)
+LOG_SAMPLE_RATES = {
+    prefix.strip(): float(rate)
+    for prefix, rate in (item.split("=", 1) for item in os.getenv("LOG_SAMPLE_RATES", "").split(",") if "=" in item)
+}
 
 
 OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3")
\ No newline at end of file
+# Ollama backends, comma separated, each optionally "url=max_concurrent" (default OLLAMA_BACKEND_MAX_CONCURRENT).
+# Generations go to the least-loaded healthy backend and fail over to another one before their first token.
+OLLAMA_BACKEND_MAX_CONCURRENT: int = int(os.getenv("OLLAMA_BACKEND_MAX_CONCURRENT", "4"))
+OLLAMA_BACKENDS = {
+    (url or cap).strip().rstrip("/"): int(cap) if url else OLLAMA_BACKEND_MAX_CONCURRENT
+    for url, _, cap in (item.rpartition("=") for item in os.getenv("OLLAMA_BASE_URLS", OLLAMA_BASE_URL).split(",") if item.strip())
+}
+# Every backend is probed (GET /api/tags) this often; one failing a probe or a request gets no work until a probe succeeds
+OLLAMA_HEALTH_INTERVAL_SECONDS: float = float(os.getenv("OLLAMA_HEALTH_INTERVAL_SECONDS", "10"))
+OLLAMA_HEALTH_TIMEOUT_SECONDS: float = float(os.getenv("OLLAMA_HEALTH_TIMEOUT_SECONDS", "2"))
+OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_CONNECT_TIMEOUT: float = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT: float = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+OLLAMA_MAX_CONNECTIONS: int = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+OLLAMA_MAX_KEEPALIVE: int = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "10"))
+OLLAMA_KEEPALIVE_EXPIRY: float = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+
+# Admission control for Ollama generations, per worker process (default capacity: the sum of the backend caps;
+# divide by the number of workers when several share the backends): beyond ADMISSION_MAX_CONCURRENT running,
+# up to ADMISSION_MAX_QUEUE wait (a freed slot goes to the user with the fewest running); the rest get 503
+ADMISSION_MAX_CONCURRENT: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", str(sum(OLLAMA_BACKENDS.values()))))
+ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30"))
+# A user with this many generations running or queued gets 429
+ADMISSION_PER_USER_MAX: int = int(os.getenv("ADMISSION_PER_USER_MAX", "2"))
+
+# Q&A result cache: in-process LRU+TTL, plus an optional persistent tier ("none" | "sqlite" | "backend")
+QA_CACHE_MAX_ENTRIES: int = int(os.getenv("QA_CACHE_MAX_ENTRIES", "256"))
+QA_CACHE_TTL_SECONDS: int = int(os.getenv("QA_CACHE_TTL_SECONDS", str(24 * 3600)))
+QA_CACHE_PERSIST: str = os.getenv("QA_CACHE_PERSIST", "sqlite")
+QA_CACHE_SQLITE_PATH: str = os.getenv("QA_CACHE_SQLITE_PATH", "./qa_cache.db")
+
+# PDF text extraction (process pool, parallel page ranges for large documents, text cache by content hash)
+PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_TEXT_CACHE_ENTRIES: int = int(os.getenv("PDF_TEXT_CACHE_ENTRIES", "128"))
+
+# Uploads are streamed in chunks and rejected as soon as they exceed the limit
+MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+MAX_MULTIPART_REQUEST_BYTES: int = int(os.getenv("MAX_MULTIPART_REQUEST_BYTES", str(2 * MAX_UPLOAD_BYTES + 1024 * 1024)))
+
+# Content-addressed upload store: unreferenced blobs are garbage collected by age and total size
+BLOB_GC_INTERVAL_SECONDS: int = int(os.getenv("BLOB_GC_INTERVAL_SECONDS", "600"))
+BLOB_MAX_TOTAL_BYTES: int = int(os.getenv("BLOB_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+BLOB_MAX_AGE_SECONDS: int = int(os.getenv("BLOB_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+
+# Background Q&A jobs: bounded worker pool, results kept for a TTL; JOB_STORE="sqlite" persists jobs across restarts
+JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX_PENDING: int = int(os.getenv("JOB_QUEUE_MAX_PENDING", "100"))
+JOB_RESULT_TTL_SECONDS: int = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_STORE: str = os.getenv("JOB_STORE", "sqlite")
+JOB_STORE_PATH: str = os.getenv("JOB_STORE_PATH", "./jobs.db")
+# Several worker processes can share jobs.db: a running job is leased to its worker, which renews the lease (and saves
+# the partial output) every third of JOB_LEASE_SECONDS; a job whose lease ran out is re-queued for any worker
+JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "30"))
+# SSE for a job another worker process runs follows it by reading the store this often
+JOB_EVENTS_POLL_SECONDS: float = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "1"))
+
+# Prompt building: JD + resume are normalized and fitted into this many (estimated) tokens
+PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+PROMPT_JD_SHARE: float = float(os.getenv("PROMPT_JD_SHARE", "0.4"))
+CHARS_PER_TOKEN: int = int(os.getenv("CHARS_PER_TOKEN", "4"))
+
+# Verified JWTs are cached (bounded LRU, entries expire with the token)
+VERIFIED_TOKEN_CACHE_SIZE: int = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+
+# Records API response cache: entries are evicted by tag on writes, so the TTL can be long
+RECORD_CACHE_TTL_SECONDS: int = int(os.getenv("RECORD_CACHE_TTL_SECONDS", "3600"))
+# Response cache tiers: a bounded in-process LRU in front of CACHE_BACKEND ("memory" = LRU only, "redis" = LRU + Redis)
+CACHE_LOCAL_MAX_ENTRIES: int = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "10000"))
+# With Redis behind it the local copy is only kept this long, so other workers see a write's eviction within this delay
+CACHE_LOCAL_TTL_SECONDS: int = int(os.getenv("CACHE_LOCAL_TTL_SECONDS", "5"))
+# Probabilistic early refresh (XFetch): larger beta recomputes hot entries earlier before they expire (0 = off)
+CACHE_XFETCH_BETA: float = float(os.getenv("CACHE_XFETCH_BETA", "1.0"))
+# Invalidation is replayed once after this delay to evict entries stored by reads that raced the write (0 = off)
+CACHE_INVALIDATION_REPLAY_SECONDS: float = float(os.getenv("CACHE_INVALIDATION_REPLAY_SECONDS", "1"))
+
+# POST /records/bulk: ops applied per executemany batch, and the cap on ops per request
+BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", "500"))
+BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "100000"))
+
+# GET /records/export: rows fetched from the cursor and written to the response per chunk
+EXPORT_CHUNK_ROWS: int = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
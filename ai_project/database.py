@@ -1,18 +1,222 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Iterator
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Union
+import time
+
+from config import (
+    SQLALCHEMY_DATABASE_URL,
+    ASYNC_DATABASE_URL,
+    DB_ASYNC,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    SQLITE_PRAGMAS,
+)
+from models.record_model import Base, Record
+from utils.logger import logger
+from utils.metrics import db_query_duration
+
+
+def _is_file_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and ":memory:" not in url and not url.rstrip("/").endswith(":")
+
+
+def _engine_options(url: str, pool_class) -> Dict[str, Any]:
+    """
+    SQLite files get a fixed pool of long-lived connections (SQLAlchemy 1.4 defaults to NullPool
+    and reopens the file per checkout, which also throws away the per-connection page cache and mmap).
+    """
+    if not url.startswith("sqlite"):
+        return {}
+    if not _is_file_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "connect_args": {"check_same_thread": False},
+    }
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _install_pragmas(target: Engine) -> None:
+    if target.dialect.name == "sqlite":
+        event.listen(target, "connect", _apply_sqlite_pragmas)
+
+
+_STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "CREATE", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def _install_query_timing(target: Engine, label: str) -> None:
+    """Time every DBAPI execute into db_query_duration_seconds, labelled by engine and statement type."""
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._query_started = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        verb = statement[:16].lstrip().split(" ", 1)[0].upper()
+        db_query_duration.labels(label, verb if verb in _STATEMENT_TYPES else "OTHER").observe(
+            time.perf_counter() - started
+        )
+
+    event.listen(target, "before_cursor_execute", before)
+    event.listen(target, "after_cursor_execute", after)
 
-from config import SQLALCHEMY_DATABASE_URL
-from models.record_model import Base
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    **_engine_options(SQLALCHEMY_DATABASE_URL, QueuePool),
 )
+_install_pragmas(engine)
+_install_query_timing(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def init_db():
-    """Create DB tables (call at startup)."""
-    Base.metadata.create_all(bind=engine)
+# Async path: aiosqlite for SQLite (asyncpg once SQLALCHEMY_DATABASE_URL points at Postgres).
+# expire_on_commit=False so returned rows can still be serialized after commit without lazy IO.
+async_engine = (
+    create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool))
+    if DB_ASYNC
+    else None
+)
+if async_engine is not None:
+    _install_pragmas(async_engine.sync_engine)
+    _install_query_timing(async_engine.sync_engine, "async")
+AsyncSessionLocal = (
+    sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+    if async_engine is not None
+    else None
+)
+
+
+class ThreadedSession:
+    """
+    The subset of the AsyncSession API used by record_service, backed by a sync Session
+    whose calls run in the threadpool. Used by get_async_db when DB_ASYNC is off.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    async def get(self, entity: Any, ident: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        def execute() -> Any:
+            # buffer the rows in the worker thread so iterating the result does no IO on the event loop
+            result = self.sync_session.execute(statement, *args, **kwargs)
+            # ORM results always return rows; Core DML results say whether they do
+            return result.freeze()() if getattr(result, "returns_rows", True) else result
+
+        return await run_in_threadpool(execute)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def refresh(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+RECORDS_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5("
+    "description, content='records', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ai AFTER INSERT ON records BEGIN "
+    "INSERT INTO records_fts(rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ad AFTER DELETE ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, description) VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_au AFTER UPDATE OF description ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, description) VALUES ('delete', old.id, old.description); "
+    "INSERT INTO records_fts(rowid, description) VALUES (new.id, new.description); END",
+)
+
+
+def _init_records_fts(conn) -> None:
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'records_fts'"
+    ).first()
+    for statement in RECORDS_FTS_DDL:
+        conn.exec_driver_sql(statement)
+    if not exists:
+        # index rows written before the search table existed
+        conn.exec_driver_sql("INSERT INTO records_fts(records_fts) VALUES ('rebuild')")
+
+
+def init_db(bind: Union[Engine, Connection, None] = None):
+    """Create DB tables, indexes and the search table; idempotent. Run through migrate.py, not per worker."""
+    bind = engine if bind is None else bind
+    Base.metadata.create_all(bind=bind)
+    # create_all skips indexes on tables that already exist; add any that are missing
+    for index in Record.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+    if bind.dialect.name == "sqlite":
+        if isinstance(bind, Connection):
+            _init_records_fts(bind)
+        else:
+            with bind.begin() as conn:
+                _init_records_fts(conn)
+
+def check_sqlite_pragmas() -> Dict[str, Any]:
+    """
+    Startup self-check: read back the pragmas a pooled connection actually runs with and log them,
+    warning where SQLite ignored or downgraded a configured value (e.g. WAL on a network filesystem).
+    """
+    if engine.dialect.name != "sqlite":
+        return {}
+    effective: Dict[str, Any] = {}
+    with engine.connect() as conn:
+        for name in SQLITE_PRAGMAS:
+            effective[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    mismatched = {
+        name: (SQLITE_PRAGMAS[name], value)
+        for name, value in effective.items()
+        if _normalize_pragma(name, SQLITE_PRAGMAS[name]) != _normalize_pragma(name, value)
+    }
+    logger.info(f"SQLite pragmas in effect: {effective} (pool={engine.pool.status()})")
+    if mismatched:
+        logger.warning(f"SQLite pragmas not applied as configured (configured, effective): {mismatched}")
+    return effective
+
+
+# pragmas that are set by name but read back as a number
+_PRAGMA_LEVELS = {
+    "synchronous": {"off": "0", "normal": "1", "full": "2", "extra": "3"},
+    "temp_store": {"default": "0", "file": "1", "memory": "2"},
+}
+
+
+def _normalize_pragma(name: str, value: Any) -> str:
+    value = str(value).lower()
+    return _PRAGMA_LEVELS.get(name, {}).get(value, value)
 
 def get_db() -> Iterator[Session]:
     db = SessionLocal()
@@ -20,3 +224,17 @@ def get_db() -> Iterator[Session]:
         yield db
     finally:
         db.close()
+
+async def get_async_db() -> AsyncIterator[Union[AsyncSession, ThreadedSession]]:
+    """Async session dependency; falls back to a threadpool-backed sync session when DB_ASYNC is off."""
+    db = AsyncSessionLocal() if AsyncSessionLocal is not None else ThreadedSession(SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
+async def close_db():
+    """Dispose pooled connections (call at shutdown)."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
@@ -1,20 +1,38 @@
-from fastapi import FastAPI, Depends, Request, UploadFile, HTTPException
+import time
+
+# Imports are timed in groups for the startup report (GET /health/startup)
+_phase_started = time.perf_counter()
+from fastapi import FastAPI, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_cache.decorator import cache
+
+from utils.startup import startup_report
+from config import STARTUP_TARGET_MS
+_phase_started = startup_report.record("import:fastapi", _phase_started)
+
+from database import close_db, check_sqlite_pragmas
+from migrate import ensure_schema
+from utils.cache_utils import init_cache, cache_stats, cache_json_response
+from utils.logger import logger
+from utils.metrics import registry, CONTENT_TYPE as METRICS_CONTENT_TYPE
+_phase_started = startup_report.record("import:database_cache", _phase_started)
 
 from auth import routes as auth_routes
-from routers import record_router
+from auth.jwt_handler import get_current_username
 from middlewares.auth_middleware import AuthMiddleware
 from middlewares.logging_middleware import LoggingMiddleware
-from utils.cache_utils import init_cache
-from database import init_db
-from utils.logger import logger
-from auth.jwt_handler import get_current_username
+from middlewares.upload_limit_middleware import UploadLimitMiddleware
+from middlewares.metrics_middleware import MetricsMiddleware
+_phase_started = startup_report.record("import:auth_middlewares", _phase_started)
 
-from services.file_service import save_upload_file
-from utils.parser_utils import extract_text_from_pdf
-from services.llama_service import generate_questions_and_answers
+# pypdf, httpx and redis are imported on first use, not here
+from routers import record_router
 from routers import qa_router
+from services.file_service import blob_store
+from services.blob_store import start_blob_gc, stop_blob_gc
+from utils.parser_utils import shutdown_pdf_executor
+from services.ollama_client import close_ollama_client
+from services.job_queue import job_queue
+startup_report.record("import:routers_services", _phase_started)
 
 app = FastAPI(title="Auth + Records + Q&A API")
 
@@ -27,8 +45,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(UploadLimitMiddleware)
 app.add_middleware(AuthMiddleware)
 app.add_middleware(LoggingMiddleware)
+# outermost, so latency covers the whole stack including auth and logging
+app.add_middleware(MetricsMiddleware)
 
 # -------------------- Routers --------------------
 app.include_router(auth_routes.router)
@@ -41,45 +62,56 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/health/startup", summary="Worker boot time broken down by import group and startup step (no auth)")
+async def startup_health():
+    return startup_report.as_dict()
+
+
+@app.get("/metrics", summary="Prometheus metrics (no auth)", include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/cached-data", summary="Authenticated cached data (2 minutes)")
-@cache(expire=120)
+@cache_json_response(expire=120)
 async def cached_data(username: str = Depends(get_current_username)):
-    import time
     return {"data": f"Hello, {username}", "timestamp": time.time()}
 
 
 @app.get("/cached-data-scope", summary="Cached using scope auth (2 minutes)")
-@cache(expire=120)
+@cache_json_response(expire=120)
 async def cached_data_scope(request: Request):
     username = request.scope.get("authenticated_user", "anonymous")
-    import time
     return {"data": f"Hello (scope), {username}", "timestamp": time.time()}
 
 
-# -------------------- New Q&A Endpoint --------------------
-@app.post("/qa/generate", summary="Upload Resume + JD (PDFs) to generate interview Q&A")
-async def generate_qa(resume: UploadFile, jd: UploadFile):
-    """
-    Upload Resume + Job Description (PDFs).
-    Returns tailored interview Q&A using LLaMA (via Ollama).
-    """
-    try:
-        resume_path = save_upload_file(resume)
-        jd_path = save_upload_file(jd)
-
-        resume_text = extract_text_from_pdf(resume_path)
-        jd_text = extract_text_from_pdf(jd_path)
-
-        qa_output = generate_questions_and_answers(jd_text, resume_text)
-        return {"questions_and_answers": qa_output}
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+@app.get("/cache/stats", summary="Response cache hit ratios per tier, miss coalescing and early refreshes")
+async def response_cache_stats(username: str = Depends(get_current_username)):
+    return cache_stats()
 
 
 # -------------------- Startup --------------------
 @app.on_event("startup")
 async def on_startup():
-    init_db()
-    init_cache(app)
+    # schema creation lives in `python -m migrate`; this is a version check unless DB_AUTO_MIGRATE has work to do
+    with startup_report.phase("init:schema"):
+        ensure_schema()
+    with startup_report.phase("init:sqlite_pragmas"):
+        check_sqlite_pragmas()
+    with startup_report.phase("init:cache"):
+        init_cache(app)
+    with startup_report.phase("init:blob_gc"):
+        start_blob_gc(blob_store)
+    with startup_report.phase("init:job_queue"):
+        await job_queue.start()
+    startup_report.finish(STARTUP_TARGET_MS)
     logger.info("Application startup complete")
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    stop_blob_gc()
+    await job_queue.stop()
+    await close_ollama_client()
+    await close_db()
+    shutdown_pdf_executor()
@@ -1,8 +1,10 @@
-from fastapi import Request
+import re
+
 from fastapi.responses import JSONResponse
-from jose import jwt, JWTError
+from jose import JWTError
+
+from auth.jwt_handler import verify_token
 
-from config import SECRET_KEY, ALGORITHM, HARDCODED_USERNAME
 
 class AuthMiddleware:
     def __init__(self, app):
@@ -10,31 +12,33 @@ class AuthMiddleware:
         self.public_paths = (
             "/auth/login",
             "/health",
+            "/metrics",
             "/docs",
             "/openapi.json",
             "/redoc",
             "/static",
         )
+        # One anchored alternation instead of a startswith() loop per request
+        self._public_path_re = re.compile("|".join(re.escape(p) for p in self.public_paths))
 
     def _is_public_path(self, path: str) -> bool:
-        for p in self.public_paths:
-            if path == p or path.startswith(p):
-                return True
-        return False
+        return self._public_path_re.match(path) is not None
 
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
 
-        request = Request(scope, receive=receive)
-        path = request.url.path
-
-        if self._is_public_path(path):
+        if self._is_public_path(scope["path"]):
             await self.app(scope, receive, send)
             return
 
-        auth_header = request.headers.get("authorization")
+        auth_header = None
+        for key, value in scope["headers"]:
+            if key == b"authorization":
+                auth_header = value.decode("latin-1")
+                break
+
         if not auth_header or not auth_header.startswith("Bearer "):
             response = JSONResponse({"detail": "Not authenticated"}, status_code=401)
             await response(scope, receive, send)
@@ -42,14 +46,15 @@ class AuthMiddleware:
 
         token = auth_header.split(" ")[1]
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            username: str = payload.get("sub")
-            if not username or username != HARDCODED_USERNAME:
-                raise JWTError()
-            scope["authenticated_user"] = username
+            claims = verify_token(token)
         except JWTError:
             response = JSONResponse({"detail": "Invalid or expired token"}, status_code=401)
             await response(scope, receive, send)
             return
 
+        # Published for downstream dependencies (auth.jwt_handler.get_current_user) so they don't re-verify
+        scope["authenticated_user"] = claims["sub"]
+        scope["auth_token"] = token
+        scope["auth_claims"] = claims
+
         await self.app(scope, receive, send)
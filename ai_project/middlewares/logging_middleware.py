@@ -1,49 +1,86 @@
-from starlette.types import ASGIApp, Receive, Scope, Send
-from fastapi import Request
-from fastapi.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import json
+import random
 import time
 
+from config import LOG_BODY_MAX_BYTES, LOG_SAMPLE_RATES
 from utils.logger import logger, mask_sensitive
 
+_JSON_TYPES = (b"application/json", b"application/problem+json")
+
+
 class LoggingMiddleware:
-    """ASGI middleware that logs incoming requests and responses (excludes sensitive fields)."""
+    """
+    ASGI middleware that logs incoming requests and responses (excludes sensitive fields).
+    Only JSON response bodies are captured, and at most `max_body_bytes` of them;
+    streamed and binary responses are logged without a body. Requests are sampled
+    per path prefix according to `sample_rates` (longest matching prefix wins, default 1.0).
+    """
 
-    def __init__(self, app: ASGIApp):
+    def __init__(self, app: ASGIApp, max_body_bytes: int = LOG_BODY_MAX_BYTES, sample_rates=LOG_SAMPLE_RATES):
         self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.sample_rates = sorted(sample_rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def _sample_rate(self, path: str) -> float:
+        for prefix, rate in self.sample_rates:
+            if path.startswith(prefix):
+                return rate
+        return 1.0
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send):
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
 
-        request = Request(scope, receive=receive)
-        start = time.time()
-        headers = dict(request.headers)
-        logged_headers = mask_sensitive(headers)
-        logger.info(f"Request -> {request.method} {request.url.path} headers={logged_headers}")
+        path = scope["path"]
+        rate = self._sample_rate(path)
+        if rate < 1.0 and (rate <= 0.0 or random.random() >= rate):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        logger.info(f"Request -> {scope['method']} {path} headers={mask_sensitive(headers)}")
 
-        # Use a small inner send wrapper to capture the response status and length
-        response_body = b""
         response_status = None
+        capture = False
+        truncated = False
+        body = bytearray()
+        limit = self.max_body_bytes
 
-        async def send_wrapper(message):
-            nonlocal response_body, response_status
+        async def send_wrapper(message: Message):
+            nonlocal response_status, capture, truncated
             if message["type"] == "http.response.start":
                 response_status = message["status"]
-            if message["type"] == "http.response.body":
-                response_body += message.get("body", b"")
+                content_type = b""
+                for key, value in message.get("headers", ()):
+                    if key.lower() == b"content-type":
+                        content_type = value.split(b";", 1)[0].strip().lower()
+                        break
+                capture = content_type in _JSON_TYPES
+            elif message["type"] == "http.response.body" and capture:
+                if message.get("more_body", False):
+                    capture = False  # streamed response: don't buffer it
+                    body.clear()
+                else:
+                    chunk = message.get("body", b"")
+                    if len(body) + len(chunk) > limit:
+                        truncated = True
+                        capture = False
+                    else:
+                        body.extend(chunk)
             await send(message)
 
         await self.app(scope, receive, send_wrapper)
 
-        elapsed_ms = (time.time() - start) * 1000
-        body_text = None
-        try:
-            body_text = response_body.decode("utf-8")
-            parsed = json.loads(body_text) if body_text else None
-            if isinstance(parsed, dict):
-                parsed = mask_sensitive(parsed)
-            logger.info(f"Response <- status={response_status} body={parsed} time_ms={elapsed_ms:.2f}")
-        except Exception:
-            logger.info(f"Response <- status={response_status} (non-json or large body) time_ms={elapsed_ms:.2f}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if body and not truncated:
+            try:
+                parsed = mask_sensitive(json.loads(body))
+                logger.info(f"Response <- status={response_status} body={parsed} time_ms={elapsed_ms:.2f}")
+                return
+            except ValueError:
+                pass
+        reason = "body over capture limit" if truncated else "body not captured"
+        logger.info(f"Response <- status={response_status} ({reason}) time_ms={elapsed_ms:.2f}")
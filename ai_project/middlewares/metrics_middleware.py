@@ -0,0 +1,41 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.metrics import http_request_duration, http_requests_in_flight
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency histograms and the in-flight request gauge.
+    Requests are labelled by route template (`/records/{record_id}`), never by raw path, so
+    series stay bounded; requests answered before routing (401s, unknown paths) are "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+        in_flight = http_requests_in_flight.labels()
+        in_flight.inc()
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            http_request_duration.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
@@ -0,0 +1,61 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from fastapi.responses import JSONResponse
+
+from config import MAX_MULTIPART_REQUEST_BYTES
+
+
+class UploadLimitMiddleware:
+    """
+    Rejects multipart uploads larger than the limit with 413: at once when the declared
+    Content-Length exceeds it, otherwise (chunked bodies) as soon as the bytes received do,
+    before the rest is read and spooled to disk.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int = MAX_MULTIPART_REQUEST_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def _too_large(self) -> JSONResponse:
+        return JSONResponse({"detail": f"Upload too large (limit {self.max_bytes} bytes)"}, status_code=413)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._too_large()(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    if not response_started:
+                        await self._too_large()(scope, receive, send)
+                    # the app sees a disconnected client and stops reading the body
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                return  # the 413 went out already; drop whatever the app answers to the cut-off body
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
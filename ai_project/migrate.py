@@ -0,0 +1,90 @@
+"""
+Schema migrations, run once per deploy instead of on every worker boot.
+
+    cd ai_project && python -m migrate          # apply pending migrations
+    python -m migrate --check                   # exit 1 if the database is behind this build
+
+SQLite keeps the applied version in `PRAGMA user_version`, so a worker starting against an
+up-to-date database pays for a single PRAGMA read. Other databases have no version slot;
+there every migration must stay idempotent and is re-applied when DB_AUTO_MIGRATE is on.
+"""
+import argparse
+import sys
+from typing import Callable, Dict, List
+
+from sqlalchemy.engine import Connection
+
+from config import DB_AUTO_MIGRATE
+from database import engine, init_db
+from utils.logger import logger
+
+# version -> step taking the schema from version - 1 to version; bump SCHEMA_VERSION with each new step
+MIGRATIONS: Dict[int, Callable[[Connection], None]] = {
+    1: init_db,  # tables, record indexes, FTS5 search table and triggers
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+def schema_version(conn: Connection) -> int:
+    if conn.dialect.name != "sqlite":
+        return 0
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def migrate() -> List[int]:
+    """Apply pending migrations and return the versions applied. Safe to run from several processes at once."""
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            for version in sorted(MIGRATIONS):
+                MIGRATIONS[version](conn)
+        return sorted(MIGRATIONS)
+
+    with engine.connect() as conn, conn.begin():
+        # take the write lock before reading the version: a concurrent migrator waits here
+        # (busy_timeout) and then finds the work done
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        pending = list(range(schema_version(conn) + 1, SCHEMA_VERSION + 1))
+        for version in pending:
+            logger.info(f"Applying schema migration {version}")
+            MIGRATIONS[version](conn)
+        if pending:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return pending
+
+
+def ensure_schema() -> bool:
+    """
+    Startup check. Returns True when this process applied migrations. With DB_AUTO_MIGRATE off,
+    a database behind this build stops the worker instead of serving requests against the wrong schema.
+    """
+    if engine.dialect.name != "sqlite":
+        return bool(migrate()) if DB_AUTO_MIGRATE else False
+    with engine.connect() as conn:
+        current = schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        if current > SCHEMA_VERSION:
+            logger.warning(f"Database schema version {current} is newer than this build ({SCHEMA_VERSION})")
+        return False
+    if not DB_AUTO_MIGRATE:
+        raise RuntimeError(
+            f"Database schema is at version {current}, this build needs {SCHEMA_VERSION}: run `python -m migrate`"
+        )
+    logger.info(f"Database schema at version {current}, migrating to {SCHEMA_VERSION} (DB_AUTO_MIGRATE)")
+    return bool(migrate())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply database schema migrations.")
+    parser.add_argument("--check", action="store_true", help="only report; exit 1 if migrations are pending")
+    args = parser.parse_args()
+    with engine.connect() as conn:
+        current = schema_version(conn)
+    if args.check:
+        print(f"schema version {current}, this build needs {SCHEMA_VERSION}")
+        sys.exit(0 if current >= SCHEMA_VERSION else 1)
+    applied = migrate()
+    print(f"applied migrations {applied}" if applied else f"schema already at version {SCHEMA_VERSION}")
+
+
+if __name__ == "__main__":
+    main()
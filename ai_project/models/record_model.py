@@ -7,6 +7,10 @@ from sqlalchemy import (
     DateTime,
     Text,
     Enum as SAEnum,
+    Index,
+    Float,
+    MetaData,
+    Table,
 )
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -28,3 +32,23 @@ class Record(Base):
     option_type = Column(SAEnum(OptionType), nullable=False)
     description = Column(Text, nullable=True)
     status = Column(SAEnum(StatusType), nullable=False, default=StatusType.ACTIVE)
+
+    # List queries filter on option_type/status and page on (created_at, id); each filter shape
+    # gets an index whose trailing columns match that ordering, so no page needs a sort or a scan.
+    __table_args__ = (
+        Index("ix_records_option_status_created", "option_type", "status", "created_at", "id"),
+        Index("ix_records_option_created", "option_type", "created_at", "id"),
+        Index("ix_records_status_created", "status", "created_at", "id"),
+        Index("ix_records_created", "created_at", "id"),
+    )
+
+
+# FTS5 index over Record.description (external content table kept in sync by triggers, see
+# database.init_db). Declared on its own MetaData so create_all never tries to create it as a plain table.
+records_fts = Table(
+    "records_fts",
+    MetaData(),
+    Column("rowid", Integer),
+    Column("description", Text),
+    Column("rank", Float),
+)
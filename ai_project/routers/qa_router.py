@@ -1,30 +1,158 @@
-from fastapi import APIRouter, UploadFile, HTTPException, Depends
-from services.file_service import save_upload_file
-from utils.parser_utils import extract_text_from_pdf
-from services.llama_service import generate_questions_and_answers
+import asyncio
+import json
+from typing import AsyncIterator, Tuple
+
+from fastapi import APIRouter, UploadFile, HTTPException, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from services.file_service import save_upload_file, release_upload, blob_store, UploadTooLarge
+from utils.parser_utils import extract_text_from_pdf_async
+from services.admission import admission, Overloaded
+from services.llama_service import generate_questions_and_answers, start_questions_and_answers, coalescing_stats
+from services.ollama_client import OllamaError, backend_stats
+from services.qa_cache import qa_cache
+from services.job_queue import job_queue, JobQueueFull
 from auth.jwt_handler import get_current_username
+from utils.request_utils import run_until_disconnect
 
 router = APIRouter(prefix="/qa", tags=["Q&A"])
 
+
+async def extract_upload_texts(resume: UploadFile, jd: UploadFile) -> Tuple[str, str]:
+    """Store both uploads (deduplicated by content) and extract their text; returns (resume_text, jd_text)."""
+    resume_upload = await save_upload_file(resume)
+    try:
+        jd_upload = await save_upload_file(jd)
+        try:
+            return await asyncio.gather(
+                extract_text_from_pdf_async(resume_upload.file, resume_upload.sha256),
+                extract_text_from_pdf_async(jd_upload.file, jd_upload.sha256),
+            )
+        finally:
+            await release_upload(jd_upload)
+    finally:
+        await release_upload(resume_upload)
+
+
+async def ndjson_token_stream(tokens: AsyncIterator[str], username: str):
+    """Frame streamed tokens as NDJSON lines, ending with a `done` line (or an `error` line)."""
+    yield json.dumps({"user": username}) + "\n"
+    try:
+        async for token in tokens:
+            yield json.dumps({"response": token}) + "\n"
+    except OllamaError as e:
+        yield json.dumps({"error": str(e)}) + "\n"
+        return
+    yield json.dumps({"done": True}) + "\n"
+
+
 @router.post("/generate", summary="Upload Resume + JD (PDFs) to generate interview Q&A")
 async def generate_qa(
+    request: Request,
     resume: UploadFile,
     jd: UploadFile,
+    stream: bool = Query(False, description="Stream tokens as NDJSON while they are generated"),
     username: str = Depends(get_current_username),
 ):
     """
     Upload Resume + Job Description (PDFs).
     Returns tailored interview Q&A using LLaMA (via Ollama).
+    With `stream=true` the answer is sent as NDJSON lines (`{"response": "<token>"}`) as it is generated.
+    When Ollama is at capacity the request fails fast with 429 (this user's share is in use) or 503,
+    both with a Retry-After header.
     """
     try:
-        resume_path = save_upload_file(resume)
-        jd_path = save_upload_file(jd)
+        resume_text, jd_text = await extract_upload_texts(resume, jd)
 
-        resume_text = extract_text_from_pdf(resume_path)
-        jd_text = extract_text_from_pdf(jd_path)
+        if stream:
+            # admitted before the response starts, so overload is still reported as a status code
+            tokens = await run_until_disconnect(request, start_questions_and_answers(jd_text, resume_text, username))
+            return StreamingResponse(ndjson_token_stream(tokens, username), media_type="application/x-ndjson")
 
-        qa_output = generate_questions_and_answers(jd_text, resume_text)
+        qa_output = await run_until_disconnect(
+            request, generate_questions_and_answers(jd_text, resume_text, username)
+        )
         return {"user": username, **qa_output}
 
+    except HTTPException:
+        raise
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except OllamaError as e:
+        raise HTTPException(status_code=502, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache/stats", summary="Q&A result cache hit/miss counters")
+async def cache_stats(username: str = Depends(get_current_username)):
+    return qa_cache.stats()
+
+
+@router.get("/coalescing/stats", summary="Generations started vs. requests coalesced onto a running one")
+async def coalescing_stats_endpoint(username: str = Depends(get_current_username)):
+    return coalescing_stats()
+
+
+@router.get("/admission/stats", summary="Generation slots in use, queue depth and rejections")
+async def admission_stats(username: str = Depends(get_current_username)):
+    return admission.stats()
+
+
+@router.get("/backends/stats", summary="Ollama backends: health, generations in flight, probe latency")
+async def ollama_backend_stats(username: str = Depends(get_current_username)):
+    return backend_stats()
+
+
+@router.get("/uploads/stats", summary="Upload store size, deduplication and GC counters")
+async def upload_stats(username: str = Depends(get_current_username)):
+    return await blob_store.stats()
+
+
+# -------------------- Background jobs --------------------
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED, summary="Queue Q&A generation and return a job id")
+async def submit_qa_job(
+    resume: UploadFile,
+    jd: UploadFile,
+    username: str = Depends(get_current_username),
+):
+    """
+    Upload Resume + Job Description (PDFs) and return immediately with a job id.
+    Poll `GET /qa/jobs/{job_id}` or subscribe to `GET /qa/jobs/{job_id}/events` (SSE).
+    """
+    try:
+        resume_text, jd_text = await extract_upload_texts(resume, jd)
+        job = await job_queue.submit(username, jd_text, resume_text)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return {"job_id": job.id, "status": job.status}
+
+
+async def get_own_job(job_id: str, username: str = Depends(get_current_username)):
+    job = await job_queue.get(job_id)
+    if job is None or job.username != username:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/stats", summary="Job queue counters")
+async def job_stats(username: str = Depends(get_current_username)):
+    return job_queue.stats()
+
+
+@router.get("/jobs/{job_id}", summary="Job status, partial output and result")
+async def read_qa_job(job=Depends(get_own_job)):
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/events", summary="Server-sent events with job status and generated tokens")
+async def stream_qa_job(job=Depends(get_own_job)):
+    async def event_stream():
+        async for event in job_queue.events(job):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
@@ -1,73 +1,307 @@
-from typing import List, Optional
+import csv
+import io
+from typing import Any, Dict, Iterator, List, Optional, Set
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from schemas.record_schemas import RecordCreate, RecordOut, RecordUpdate, OptionType, StatusType
-from services.record_service import create_record, get_record, list_records, update_record, delete_record
+from schemas.record_schemas import (
+    RecordCreate,
+    RecordOut,
+    RecordPage,
+    RecordUpdate,
+    OptionType,
+    StatusType,
+    BulkCreate,
+    BulkOperation,
+    BulkResult,
+)
+from services.record_service import (
+    create_record_async,
+    get_record_async,
+    get_record_dict_async,
+    list_records_page_async,
+    search_records_page_async,
+    update_record_async,
+    delete_record_async,
+    apply_bulk_batch,
+    iter_record_rows,
+    RECORD_COLUMNS,
+    InvalidCursor,
+    InvalidSearchQuery,
+)
 from auth.jwt_handler import get_current_user, get_current_username
-from database import get_db
-from fastapi_cache.decorator import cache
+from database import engine, get_db, get_async_db
+from config import RECORD_CACHE_TTL_SECONDS, BULK_BATCH_SIZE, BULK_MAX_ITEMS, EXPORT_CHUNK_ROWS
+from utils.cache_utils import cache_json_response, invalidate_tags
+from utils.json_utils import dumps, loads
+from utils.request_utils import iter_json_items
+from utils.logger import logger
 
 router = APIRouter(prefix="/records", tags=["records"])
 
 
+def _value(enum_member) -> Optional[str]:
+    return enum_member.value if enum_member is not None else None
+
+
+def _list_tag(option_type: Optional[str], status: Optional[str]) -> str:
+    return f"records:list:{option_type or '*'}:{status or '*'}"
+
+
+def _list_tags(option_type=None, status=None, **_) -> List[str]:
+    """A cached list page is tagged by its filter shape."""
+    return [_list_tag(_value(option_type), _value(status))]
+
+
+def _record_tags(record_id: int, **_) -> List[str]:
+    return [f"record:{record_id}"]
+
+
+def _row_tags(record_id: int, option_type, rec_status) -> Set[str]:
+    """Tags whose cached responses may include this row: its own entry and every list filter shape that matches it."""
+    option_type, rec_status = _value(option_type), _value(rec_status)
+    return {
+        f"record:{record_id}",
+        _list_tag(None, None),
+        _list_tag(option_type, None),
+        _list_tag(None, rec_status),
+        _list_tag(option_type, rec_status),
+    }
+
+
+def _write_tags(rec) -> Set[str]:
+    return _row_tags(rec.id, rec.option_type, rec.status)
+
+
+_bulk_operation = TypeAdapter(BulkOperation)
+
+
 @router.post("/", response_model=RecordOut, status_code=status.HTTP_201_CREATED)
-def create(record_in: RecordCreate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def create(record_in: RecordCreate, db: AsyncSession = Depends(get_async_db), current_user=Depends(get_current_user)):
     """
-    Create a new record. Requires authentication.
+    Create a new record. Requires authentication. Evicts the cached list pages it would appear in.
     """
-    rec = create_record(db, record_in)
+    rec = await create_record_async(db, record_in)
+    await invalidate_tags(*_write_tags(rec))
     return rec
 
 
-@router.get("/", response_model=List[RecordOut])
-@cache(expire=120)
-def read_records(
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_write(request: Request, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+    """
+    Apply many creates, partial updates and deletes in a single transaction. Requires authentication.
+    Body: `{"ops": [...]}`, or NDJSON (`Content-Type: application/x-ndjson`, one op per line), which is
+    streamed and applied in batches of BULK_BATCH_SIZE. Ops look like
+    `{"op": "create", "data": {...}}`, `{"op": "update", "id": 1, "data": {...}}`, `{"op": "delete", "id": 1}`.
+    Invalid ops and unknown ids fail individually; every other op is committed together.
+    Runs on the sync session in the threadpool: bulk_*_mappings are sync-only and insert row by row
+    when returning ids, which costs an extra thread hop per row through aiosqlite.
+    """
+    results: List[Dict[str, Any]] = []
+    counts = {"create": 0, "update": 0, "delete": 0}
+    tags: Set[str] = set()
+    batch: List[tuple] = []
+    batch_ids: Set[int] = set()
+
+    async def flush():
+        batch_results, touched = await run_in_threadpool(apply_bulk_batch, db, batch)
+        for item in batch_results:
+            results.append(item)
+            if item["ok"]:
+                counts[item["op"]] += 1
+        for row in touched:
+            tags.update(_row_tags(*row))
+        batch.clear()
+        batch_ids.clear()
+
+    index = -1
+    try:
+        async for raw in iter_json_items(request, "ops"):
+            index += 1
+            if index >= BULK_MAX_ITEMS:
+                raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} operations per request")
+            try:
+                op = _bulk_operation.validate_python(loads(raw) if isinstance(raw, bytes) else raw)
+            except (ValueError, ValidationError) as e:
+                if isinstance(e, ValidationError):
+                    first = e.errors(include_url=False)[0]
+                    error = first["msg"]
+                    if first["loc"]:  # empty when the operation itself is not an object or has no valid "op"
+                        error = f"{'.'.join(str(part) for part in first['loc'])}: {error}"
+                else:
+                    error = "Invalid JSON"
+                results.append({"index": index, "ok": False, "error": error})
+                continue
+            # ops on the same id must apply in order, so a repeat starts a new batch
+            op_id = None if isinstance(op, BulkCreate) else op.id
+            if len(batch) >= BULK_BATCH_SIZE or (op_id is not None and op_id in batch_ids):
+                await flush()
+            batch.append((index, op))
+            if op_id is not None:
+                batch_ids.add(op_id)
+        if batch:
+            await flush()
+        await run_in_threadpool(db.commit)
+    except HTTPException:
+        await run_in_threadpool(db.rollback)
+        raise
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        logger.exception("Bulk write failed")
+        raise HTTPException(status_code=500, detail=f"Bulk write failed, nothing was applied: {e}")
+
+    await invalidate_tags(*tags)
+    results.sort(key=lambda item: item["index"])
+    return {
+        "created": counts["create"],
+        "updated": counts["update"],
+        "deleted": counts["delete"],
+        "failed": sum(1 for item in results if not item["ok"]),
+        "results": results,
+    }
+
+
+@router.get("/", response_model=RecordPage)
+@cache_json_response(expire=RECORD_CACHE_TTL_SECONDS, namespace="records", tags=_list_tags)
+async def read_records(
     username: str = Depends(get_current_username),
-    db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    skip: int = Query(0, ge=0, description="Offset fallback, ignored when cursor is given"),
     limit: int = Query(50, ge=1, le=100),
     option_type: Optional[OptionType] = None,
     status: Optional[StatusType] = None,
 ):
     """
-    List records. Cached 2 minutes per user (username included in dependencies).
+    List records ordered by (created_at, id), one page at a time; pass `next_cursor` back as `cursor` for the next page.
+    Cached per user (username included in dependencies) until a write touches a matching record.
+    Rows are projected straight to dicts and the encoded JSON bytes are what is cached (see cache_json_response);
+    response_model only documents the shape.
+    """
+    try:
+        items, next_cursor = await list_records_page_async(
+            db, cursor=cursor, skip=skip, limit=limit, option_type=option_type, status=status
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _export_value(value: Any) -> Any:
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+def _ndjson_chunks(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(dumps(dict(zip(RECORD_COLUMNS, row))) + b"\n" for row in rows)
+
+
+def _csv_chunks(chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(RECORD_COLUMNS)
+    yield buffer.getvalue().encode()  # header goes out before the first query page
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_export_value(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode()
+
+
+_EXPORT_FORMATS = {
+    "ndjson": (_ndjson_chunks, "application/x-ndjson"),
+    "csv": (_csv_chunks, "text/csv; charset=utf-8"),
+}
+
+
+@router.get("/export")
+async def export_records(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    option_type: Optional[OptionType] = None,
+    status: Optional[StatusType] = None,
+    current_user=Depends(get_current_user),
+):
+    """
+    Stream every matching record as NDJSON or CSV, straight from a server-side cursor with constant memory.
+    Takes the same filters as the list endpoint. Not cached; registered before /{record_id}.
+    """
+    encode, media_type = _EXPORT_FORMATS[fmt]
+    chunks = iter_record_rows(engine, chunk_rows=EXPORT_CHUNK_ROWS, option_type=option_type, status=status)
+    return StreamingResponse(
+        encode(chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="records.{fmt}"'},
+    )
+
+
+@router.get("/search", response_model=RecordPage)
+@cache_json_response(expire=RECORD_CACHE_TTL_SECONDS, namespace="records", tags=_list_tags)
+async def search_records(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in description; `word*` matches a prefix"),
+    username: str = Depends(get_current_username),
+    db: AsyncSession = Depends(get_async_db),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    option_type: Optional[OptionType] = None,
+    status: Optional[StatusType] = None,
+):
+    """
+    Full-text search over record descriptions (SQLite FTS5), best matches first; every word must match.
+    Registered before /{record_id} so "search" is not taken for an id. Cached like the list endpoint.
     """
-    return list_records(db, skip=skip, limit=limit, option_type=option_type, status=status)
+    try:
+        items, next_cursor = await search_records_page_async(
+            db, q, cursor=cursor, limit=limit, option_type=option_type, status=status
+        )
+    except (InvalidCursor, InvalidSearchQuery) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.get("/{record_id}", response_model=RecordOut)
-@cache(expire=120)
-def read_record(record_id: int, username: str = Depends(get_current_username), db: Session = Depends(get_db)):
+@cache_json_response(expire=RECORD_CACHE_TTL_SECONDS, namespace="records", tags=_record_tags)
+async def read_record(record_id: int, username: str = Depends(get_current_username), db: AsyncSession = Depends(get_async_db)):
     """
-    Get a single record by id. Cached 2 minutes per user.
+    Get a single record by id. Cached per user until the record is updated or deleted.
     """
-    rec = get_record(db, record_id)
+    rec = await get_record_dict_async(db, record_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Record not found")
     return rec
 
 
 @router.put("/{record_id}", response_model=RecordOut)
-def put_record(record_id: int, updates: RecordUpdate, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def put_record(record_id: int, updates: RecordUpdate, db: AsyncSession = Depends(get_async_db), current_user=Depends(get_current_user)):
     """
-    Update a record. Authentication required. Cache will not be auto-invalidated (for production implement cache invalidation).
+    Update a record. Authentication required. Evicts cached entries for the record's old and new filter shapes.
     """
-    rec = get_record(db, record_id)
+    rec = await get_record_async(db, record_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Record not found")
-    updated = update_record(db, rec, updates)
+    tags = _write_tags(rec)
+    updated = await update_record_async(db, rec, updates)
+    await invalidate_tags(*(tags | _write_tags(updated)))
     return updated
 
 
 @router.delete("/{record_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_record(record_id: int, db: Session = Depends(get_db), current_user=Depends(get_current_user)):
+async def remove_record(record_id: int, db: AsyncSession = Depends(get_async_db), current_user=Depends(get_current_user)):
     """
     Delete a record. Authentication required.
     """
-    rec = get_record(db, record_id)
+    rec = await get_record_async(db, record_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Record not found")
-    delete_record(db, rec)
+    tags = _write_tags(rec)
+    await delete_record_async(db, rec)
+    await invalidate_tags(*tags)
     return None
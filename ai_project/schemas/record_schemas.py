@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Annotated, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -31,3 +31,36 @@ class RecordOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+class RecordPage(BaseModel):
+    items: List[RecordOut]
+    next_cursor: Optional[str] = None
+
+class BulkCreate(BaseModel):
+    op: Literal["create"]
+    data: RecordCreate
+
+class BulkUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    data: RecordUpdate
+
+class BulkDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+BulkOperation = Annotated[Union[BulkCreate, BulkUpdate, BulkDelete], Field(discriminator="op")]
+
+class BulkItemResult(BaseModel):
+    index: int
+    op: Optional[str] = None
+    id: Optional[int] = None
+    ok: bool
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[BulkItemResult]
@@ -0,0 +1,161 @@
+import asyncio
+import itertools
+import math
+import time
+from typing import Dict, List, Optional
+
+from config import (
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_PER_USER_MAX,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+)
+from utils.logger import logger
+from utils.metrics import CallbackMetric, llm_admission_rejected, llm_admission_wait
+
+# Used for Retry-After until a generation has finished and given a real duration
+_INITIAL_HOLD_SECONDS = 10.0
+_MAX_RETRY_AFTER_SECONDS = 300
+
+
+class Overloaded(Exception):
+    """Raised when a generation is not admitted; carries the HTTP status (429/503) and a Retry-After in seconds."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("username", "seq", "future")
+
+    def __init__(self, username: str, seq: int, future: asyncio.Future):
+        self.username = username
+        self.seq = seq
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Caps the Ollama generations this process runs at once. Over capacity, requests wait in a bounded
+    queue and a freed slot goes to the waiting user with the fewest generations running (oldest first
+    among equals), so one user's burst cannot starve everyone else. Interactive requests fail fast:
+    429 when the user already has `per_user_max` generations running or queued, 503 when the queue is
+    full or the wait exceeds `queue_timeout`. Background callers (the job queue) wait without a bound.
+    """
+
+    def __init__(self, capacity: int, max_queue: int, per_user_max: int, queue_timeout: float):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.per_user_max = per_user_max
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._avg_hold = _INITIAL_HOLD_SECONDS
+        self._stats = {"admitted": 0, "waited": 0, "rejected_user_share": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    def _retry_after(self, ahead: int) -> int:
+        """Seconds until a slot is likely free for a request with `ahead` others in front of it."""
+        rounds = ahead // self.capacity + 1
+        return max(1, min(_MAX_RETRY_AFTER_SECONDS, math.ceil(rounds * self._avg_hold)))
+
+    def _reject(self, reason: str, message: str, status_code: int, retry_after: int) -> Overloaded:
+        self._stats[f"rejected_{reason}"] += 1
+        llm_admission_rejected.labels(reason).inc()
+        logger.warning(f"Admission: {message} (running {self._active}/{self.capacity}, queued {len(self._waiters)})")
+        return Overloaded(message, status_code, retry_after)
+
+    def _grant(self, username: str) -> None:
+        self._active += 1
+        self._running[username] = self._running.get(username, 0) + 1
+        self._stats["admitted"] += 1
+
+    def _dequeue(self, waiter: _Waiter) -> None:
+        self._waiters.remove(waiter)
+        self._waiting[waiter.username] -= 1
+        if not self._waiting[waiter.username]:
+            del self._waiting[waiter.username]
+
+    def _dispatch(self) -> None:
+        while self._active < self.capacity and self._waiters:
+            waiter = min(self._waiters, key=lambda w: (self._running.get(w.username, 0), w.seq))
+            self._dequeue(waiter)
+            self._grant(waiter.username)
+            waiter.future.set_result(None)
+
+    async def acquire(self, username: str, background: bool = False) -> None:
+        """Wait for a generation slot; call release() when the generation ends. Raises Overloaded."""
+        if not background:
+            pending = self._running.get(username, 0) + self._waiting.get(username, 0)
+            if pending >= self.per_user_max:
+                raise self._reject(
+                    "user_share", f"{pending} generations already running or queued for this user", 429,
+                    self._retry_after(0),
+                )
+        if self._active < self.capacity and not self._waiters:
+            self._grant(username)
+            llm_admission_wait.labels("admitted").observe(0.0)
+            return
+        if not background and len(self._waiters) >= self.max_queue:
+            raise self._reject(
+                "queue_full", "Too many generations waiting, retry later", 503, self._retry_after(len(self._waiters))
+            )
+
+        waiter = _Waiter(username, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._waiting[username] = self._waiting.get(username, 0) + 1
+        self._stats["waited"] += 1
+        started = time.monotonic()
+        try:
+            if background:
+                await waiter.future
+            else:
+                await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # granted in the same tick the caller went away: pass the slot on
+                self.release(username)
+            elif waiter in self._waiters:
+                self._dequeue(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                llm_admission_wait.labels("timeout").observe(time.monotonic() - started)
+                raise self._reject(
+                    "timeout", f"No generation slot within {self.queue_timeout:.0f}s, retry later", 503,
+                    self._retry_after(len(self._waiters)),
+                ) from None
+            llm_admission_wait.labels("cancelled").observe(time.monotonic() - started)
+            raise
+        llm_admission_wait.labels("admitted").observe(time.monotonic() - started)
+
+    def release(self, username: str, held_seconds: Optional[float] = None) -> None:
+        """Free a slot; `held_seconds` (the generation's duration) feeds the Retry-After estimate."""
+        self._active -= 1
+        self._running[username] -= 1
+        if not self._running[username]:
+            del self._running[username]
+        if held_seconds is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_seconds
+        self._dispatch()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "capacity": self.capacity,
+            "running": self._active,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "per_user_max": self.per_user_max,
+            "users_running": len(self._running),
+            "avg_generation_seconds": round(self._avg_hold, 2),
+            **self._stats,
+        }
+
+
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_PER_USER_MAX, ADMISSION_QUEUE_TIMEOUT_SECONDS
+)
+CallbackMetric("llm_admission_running", "Ollama generations holding an admission slot", (), lambda: {(): admission.stats()["running"]})
+CallbackMetric("llm_admission_queue_depth", "Generations waiting for an admission slot", (), lambda: {(): admission.stats()["queued"]})
@@ -0,0 +1,206 @@
+import asyncio
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from config import BLOB_GC_INTERVAL_SECONDS, BLOB_MAX_TOTAL_BYTES, BLOB_MAX_AGE_SECONDS
+from utils.logger import logger
+
+
+class BlobStore:
+    """
+    Content-addressed file store: each distinct upload is kept once at
+    `<root>/blobs/<sha[:2]>/<sha>`, indexed in `<root>/blobs.db` with a reference
+    count and last-access time. Unreferenced blobs are removed by `gc()` once they
+    are older than the age limit, or oldest-first while the store is over its size limit.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.index_path = os.path.join(root, "blobs.db")
+        self._dirs_ready = False
+        self._ready = False
+        self.dedup_hits = 0
+        self.dedup_bytes_saved = 0
+        self.gc_runs = 0
+        self.gc_deleted = 0
+        self.gc_bytes_freed = 0
+
+    def _ensure_dirs(self) -> None:
+        if not self._dirs_ready:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            os.makedirs(self.tmp_dir, exist_ok=True)
+            self._dirs_ready = True
+
+    def _connect(self) -> sqlite3.Connection:
+        self._ensure_dirs()
+        conn = sqlite3.connect(self.index_path, timeout=10, isolation_level=None)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                " sha256 TEXT PRIMARY KEY, size INTEGER NOT NULL, filename TEXT,"
+                " refcount INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_blobs_gc ON blobs (refcount, last_access)")
+            self._ready = True
+        return conn
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256[:2], sha256)
+
+    def new_tmp_path(self, name: str) -> str:
+        """Path for an in-progress upload (same filesystem as the blobs, so `put` is a rename)."""
+        self._ensure_dirs()
+        return os.path.join(self.tmp_dir, name)
+
+    def _put(self, tmp_path: str, sha256: str, size: int, filename: Optional[str]) -> str:
+        path = self.blob_path(sha256)
+        now = time.time()
+        with closing(self._connect()) as conn:
+            # IMMEDIATE takes the write lock so gc() in another worker cannot delete the blob mid-put
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+                if row and os.path.exists(path):
+                    os.remove(tmp_path)
+                    conn.execute(
+                        "UPDATE blobs SET refcount = refcount + 1, last_access = ? WHERE sha256 = ?", (now, sha256)
+                    )
+                    self.dedup_hits += 1
+                    self.dedup_bytes_saved += size
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+                    if row:
+                        # the file went missing under an existing row: restore it, but keep the other holders' references
+                        conn.execute(
+                            "UPDATE blobs SET refcount = refcount + 1, last_access = ? WHERE sha256 = ?", (now, sha256)
+                        )
+                    else:
+                        conn.execute(
+                            "INSERT INTO blobs (sha256, size, filename, refcount, created_at, last_access)"
+                            " VALUES (?, ?, ?, 1, ?, ?)",
+                            (sha256, size, filename, now, now),
+                        )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return path
+
+    def _release(self, sha256: str) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE blobs SET refcount = MAX(refcount - 1, 0), last_access = ? WHERE sha256 = ?",
+                (time.time(), sha256),
+            )
+
+    def _gc(self, max_total_bytes: int, max_age_seconds: int) -> int:
+        deleted = freed = 0
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+                cutoff = time.time() - max_age_seconds
+                candidates = conn.execute(
+                    "SELECT sha256, size, last_access FROM blobs WHERE refcount = 0 ORDER BY last_access"
+                ).fetchall()
+                for sha256, size, last_access in candidates:
+                    if last_access >= cutoff and total <= max_total_bytes:
+                        break
+                    try:
+                        os.remove(self.blob_path(sha256))
+                    except FileNotFoundError:
+                        pass
+                    conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                    total -= size
+                    deleted += 1
+                    freed += size
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        deleted += self._sweep_tmp(max_age_seconds)
+        self.gc_runs += 1
+        self.gc_deleted += deleted
+        self.gc_bytes_freed += freed
+        return deleted
+
+    def _sweep_tmp(self, max_age_seconds: int) -> int:
+        """Remove partial uploads left behind by crashed or killed requests."""
+        removed = 0
+        cutoff = time.time() - min(max_age_seconds, 3600)
+        for entry in os.scandir(self.tmp_dir):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def _stats(self) -> Dict[str, int]:
+        with closing(self._connect()) as conn:
+            count, total, referenced = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refcount > 0), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "blobs": count,
+            "total_bytes": total,
+            "referenced_blobs": referenced,
+            "dedup_hits": self.dedup_hits,
+            "dedup_bytes_saved": self.dedup_bytes_saved,
+            "gc_runs": self.gc_runs,
+            "gc_deleted": self.gc_deleted,
+            "gc_bytes_freed": self.gc_bytes_freed,
+            "max_total_bytes": BLOB_MAX_TOTAL_BYTES,
+            "max_age_seconds": BLOB_MAX_AGE_SECONDS,
+        }
+
+    async def put(self, tmp_path: str, sha256: str, size: int, filename: Optional[str] = None) -> str:
+        """Move a fully written temp file into the store (or drop it if the content exists) and take a reference."""
+        return await run_in_threadpool(self._put, tmp_path, sha256, size, filename)
+
+    async def release(self, sha256: str) -> None:
+        """Drop a reference taken by `put`; the blob becomes eligible for GC at zero."""
+        await run_in_threadpool(self._release, sha256)
+
+    async def gc(self, max_total_bytes: int = BLOB_MAX_TOTAL_BYTES, max_age_seconds: int = BLOB_MAX_AGE_SECONDS) -> int:
+        return await run_in_threadpool(self._gc, max_total_bytes, max_age_seconds)
+
+    async def stats(self) -> Dict[str, int]:
+        return await run_in_threadpool(self._stats)
+
+
+_gc_task: Optional[asyncio.Task] = None
+
+
+async def _gc_loop(store: BlobStore) -> None:
+    while True:
+        await asyncio.sleep(BLOB_GC_INTERVAL_SECONDS)
+        try:
+            deleted = await store.gc()
+            if deleted:
+                logger.info(f"Blob GC removed {deleted} unreferenced uploads")
+        except Exception:
+            logger.exception("Blob GC failed")
+
+
+def start_blob_gc(store: BlobStore) -> None:
+    """Start the periodic GC task (call at startup)."""
+    global _gc_task
+    if _gc_task is None:
+        _gc_task = asyncio.get_running_loop().create_task(_gc_loop(store))
+
+
+def stop_blob_gc() -> None:
+    global _gc_task
+    if _gc_task is not None:
+        _gc_task.cancel()
+        _gc_task = None
@@ -1,14 +1,76 @@
+import hashlib
 import os
 import uuid
+from dataclasses import dataclass
+from typing import BinaryIO
+
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from config import MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE
+from services.blob_store import BlobStore
 
 UPLOAD_DIR = "uploads"
 
-def save_upload_file(upload_file: UploadFile) -> str:
-    """Save uploaded file to disk and return the file path."""
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    filename = f"{uuid.uuid4()}_{upload_file.filename}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    with open(file_path, "wb") as buffer:
-        buffer.write(upload_file.file.read())
-    return file_path
+blob_store = BlobStore(UPLOAD_DIR)
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    filename: str
+    size: int
+    sha256: str
+    file: BinaryIO  # the request's spooled upload, rewound, for direct parsing
+
+
+async def save_upload_file(upload_file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredUpload:
+    """
+    Stream an uploaded file into the content-addressed blob store, hashing it on the way.
+    Identical content is stored once. Aborts (and removes the partial file) as soon as
+    more than `max_bytes` have been read. The caller holds a reference on the blob until
+    it calls `release_upload`.
+    """
+    filename = os.path.basename(upload_file.filename or "upload")
+    tmp_path = blob_store.new_tmp_path(f"{uuid.uuid4()}.part")
+
+    digest = hashlib.sha256()
+    size = 0
+    await upload_file.seek(0)
+    buffer = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"{filename} exceeds the {max_bytes} byte upload limit")
+            digest.update(chunk)
+            await run_in_threadpool(buffer.write, chunk)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        os.remove(tmp_path)
+        raise
+    await run_in_threadpool(buffer.close)
+
+    sha256 = digest.hexdigest()
+    path = await blob_store.put(tmp_path, sha256, size, filename)
+
+    await upload_file.seek(0)
+    return StoredUpload(
+        path=path,
+        filename=filename,
+        size=size,
+        sha256=sha256,
+        file=upload_file.file,
+    )
+
+
+async def release_upload(upload: StoredUpload) -> None:
+    """Drop the reference taken by save_upload_file so the blob can be garbage collected."""
+    await blob_store.release(upload.sha256)
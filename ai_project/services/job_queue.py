@@ -0,0 +1,428 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from config import (
+    JOB_WORKERS,
+    JOB_QUEUE_MAX_PENDING,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_STORE,
+    JOB_STORE_PATH,
+    JOB_LEASE_SECONDS,
+    JOB_EVENTS_POLL_SECONDS,
+)
+from services.llama_service import stream_questions_and_answers
+from utils.logger import logger
+from utils.metrics import CallbackMetric
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    """Raised when JOB_QUEUE_MAX_PENDING jobs are already waiting."""
+
+
+@dataclass
+class Job:
+    id: str
+    username: str
+    jd_text: str
+    resume_text: str
+    status: str = QUEUED
+    tokens: List[str] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    expires_at: Optional[float] = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def touch(self) -> None:
+        """Record an update and wake every subscriber."""
+        self.updated_at = time.time()
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self, include_partial: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "expires_at": self.expires_at,
+        }
+        if self.result is not None:
+            data["result"] = self.result
+        elif include_partial:
+            data["partial_output"] = "".join(self.tokens)
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+_COLUMNS = (
+    "id, username, status, jd_text, resume_text, result, error, created_at, updated_at, expires_at, partial"
+)
+
+
+class SQLiteJobStore:
+    """
+    Keeps jobs in a SQLite file so queued work and finished results survive restarts.
+    Worker processes sharing the file claim a job with a lease they keep renewing; only jobs
+    whose lease has expired (their worker died) are handed to another worker.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._table_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._table_ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, username TEXT NOT NULL, status TEXT NOT NULL,"
+                " jd_text TEXT NOT NULL, resume_text TEXT NOT NULL, result TEXT, error TEXT,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL, expires_at REAL,"
+                " owner TEXT, lease_expires_at REAL, partial TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL"), ("partial", "TEXT")):
+                if column not in columns:  # jobs.db from before leases
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._table_ready = True
+        return conn
+
+    def _save(self, job: Job) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs"
+                " (id, username, status, jd_text, resume_text, result, error, created_at, updated_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id, job.username, job.status, job.jd_text, job.resume_text,
+                    json.dumps(job.result) if job.result is not None else None, job.error,
+                    job.created_at, job.updated_at, job.expires_at,
+                ),
+            )
+
+    def _load(self, where: str, params: tuple) -> List[Job]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(f"SELECT {_COLUMNS} FROM jobs WHERE {where}", params).fetchall()
+        return [
+            Job(
+                id=r[0], username=r[1], status=r[2], jd_text=r[3], resume_text=r[4],
+                result=json.loads(r[5]) if r[5] else None, error=r[6],
+                created_at=r[7], updated_at=r[8], expires_at=r[9], tokens=[r[10]] if r[10] else [],
+            )
+            for r in rows
+        ]
+
+    def _requeue_expired(self, now: float) -> List[Job]:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_expires_at = NULL, partial = NULL"
+                " WHERE status = ? AND (lease_expires_at IS NULL OR lease_expires_at <= ?)",
+                (QUEUED, RUNNING, now),
+            )
+        return self._load("status = ? ORDER BY created_at", (QUEUED,))
+
+    def _claim(self, job_id: str, owner: str, lease_until: float) -> bool:
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_expires_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, owner, lease_until, time.time(), job_id, QUEUED),
+            )
+            return cursor.rowcount == 1
+
+    def _renew(self, owner: str, lease_until: float, partials: Dict[str, str]) -> List[str]:
+        lost = []
+        with closing(self._connect()) as conn, conn:
+            for job_id, partial in partials.items():
+                cursor = conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ?, partial = ?, updated_at = ?"
+                    " WHERE id = ? AND owner = ? AND status = ?",
+                    (lease_until, partial, time.time(), job_id, owner, RUNNING),
+                )
+                if cursor.rowcount != 1:
+                    lost.append(job_id)
+        return lost
+
+    def _finish(self, job: Job, owner: str) -> bool:
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ?,"
+                " owner = NULL, lease_expires_at = NULL, partial = NULL WHERE id = ? AND owner = ?",
+                (
+                    job.status, json.dumps(job.result) if job.result is not None else None, job.error,
+                    job.updated_at, job.expires_at, job.id, owner,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def _purge(self, now: float) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    async def save(self, job: Job) -> None:
+        await run_in_threadpool(self._save, job)
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        jobs = await run_in_threadpool(self._load, "id = ? AND (expires_at IS NULL OR expires_at > ?)", (job_id, time.time()))
+        return jobs[0] if jobs else None
+
+    async def requeue_expired(self) -> List[Job]:
+        """Reset running jobs whose lease ran out (their worker is gone) to queued; returns every queued job."""
+        return await run_in_threadpool(self._requeue_expired, time.time())
+
+    async def claim(self, job_id: str, owner: str, lease: float) -> bool:
+        """Atomically move a queued job to running, leased to `owner`; False if another worker got it first."""
+        return await run_in_threadpool(self._claim, job_id, owner, time.time() + lease)
+
+    async def renew(self, owner: str, lease: float, partials: Dict[str, str]) -> List[str]:
+        """Extend `owner`'s leases and save each job's partial output; returns the ids whose lease was lost."""
+        return await run_in_threadpool(self._renew, owner, time.time() + lease, partials)
+
+    async def finish(self, job: Job, owner: str) -> bool:
+        """Save the outcome; False (nothing written) if `owner` no longer holds the job."""
+        return await run_in_threadpool(self._finish, job, owner)
+
+    async def purge(self) -> None:
+        await run_in_threadpool(self._purge, time.time())
+
+
+class JobQueue:
+    """
+    Bounded in-process worker pool for Q&A generation jobs.
+    Workers stream tokens into the job so clients can poll or subscribe to partial output;
+    finished jobs are kept for `ttl` seconds. With a store, several processes share the jobs:
+    each running job is leased to one of them, and queued jobs or jobs whose lease expired are
+    picked up on startup and then periodically. Partial output of a job running in another
+    process is as fresh as its last lease renewal.
+    """
+
+    def __init__(
+        self, workers: int, max_pending: int, ttl: int, store: Optional[SQLiteJobStore] = None,
+        lease: float = JOB_LEASE_SECONDS, poll_interval: float = JOB_EVENTS_POLL_SECONDS,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.store = store
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        if self.store is not None:
+            requeued = await self._pick_up_queued()
+            if requeued:
+                logger.info(f"Job queue: picked up {requeued} queued or orphaned jobs")
+            self._tasks.append(asyncio.create_task(self._lease_loop()))
+        self._tasks += [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purge_loop()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, username: str, jd_text: str, resume_text: str) -> Job:
+        if self._queue is None:
+            raise RuntimeError("JobQueue.start() has not been called")
+        if self._queue.qsize() >= self.max_pending:
+            raise JobQueueFull("Too many pending jobs, retry later")
+        job = Job(id=uuid.uuid4().hex, username=username, jd_text=jd_text, resume_text=resume_text)
+        self._jobs[job.id] = job
+        if self.store is not None:
+            await self.store.save(job)
+        self._queue.put_nowait(job.id)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None:
+            if job.expires_at is not None and job.expires_at <= time.time():
+                return None
+            # a job still queued here may have been claimed by another process since
+            if job.status != QUEUED or self.store is None:
+                return job
+        if self.store is not None:
+            stored = await self.store.get(job_id)
+            if job is not None and stored is not None and stored.status == QUEUED:
+                return job
+            return stored
+        return None
+
+    async def events(self, job: Job) -> AsyncIterator[Dict[str, Any]]:
+        """Yield `status` and `token` events until the job finishes, then a final `done`/`failed` event."""
+        sent_tokens = 0
+        status = None
+        while self._jobs.get(job.id) is job:
+            changed = job.changed
+            if job.status != status:
+                status = job.status
+                yield {"event": "status", "data": {"status": status}}
+            if len(job.tokens) > sent_tokens:
+                yield {"event": "token", "data": {"response": "".join(job.tokens[sent_tokens:])}}
+                sent_tokens = len(job.tokens)
+            if job.finished:
+                yield {"event": job.status, "data": job.to_dict(include_partial=False)}
+                return
+            await changed.wait()
+        if status is not None:
+            # dropped while we followed it (another process claimed it, or our lease was lost)
+            sent_chars = len("".join(job.tokens[:sent_tokens]))
+            job = await self.store.get(job.id)
+            if job is None:
+                return
+        else:
+            sent_chars = 0
+        async for event in self._stored_events(job, status, sent_chars):
+            yield event
+
+    async def _stored_events(
+        self, job: Job, status: Optional[str] = None, sent_chars: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Events for a job run by another process, read from the store every `poll_interval` seconds."""
+        while True:
+            if job.status != status:
+                status = job.status
+                yield {"event": "status", "data": {"status": status}}
+            partial = "".join(job.tokens)
+            if len(partial) > sent_chars:
+                yield {"event": "token", "data": {"response": partial[sent_chars:]}}
+                sent_chars = len(partial)
+            if job.finished:
+                yield {"event": job.status, "data": job.to_dict(include_partial=False)}
+                return
+            await asyncio.sleep(self.poll_interval)
+            job = await self.store.get(job.id)
+            if job is None:
+                return  # expired meanwhile
+
+    def stats(self) -> Dict[str, int]:
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {"workers": self.workers, "max_pending": self.max_pending, **counts}
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            if self.store is not None and not await self._claim(job):
+                continue
+            job.status = RUNNING
+            job.touch()
+            try:
+                async for token in stream_questions_and_answers(
+                    job.jd_text, job.resume_text, job.username, background=True
+                ):
+                    job.tokens.append(token)
+                    job.touch()
+                job.result = {"questions_and_answers": "".join(job.tokens).strip()}
+                job.status = DONE
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = FAILED
+            job.expires_at = time.time() + self.ttl
+            if self.store is not None:
+                try:
+                    if not await self.store.finish(job, self.owner):
+                        logger.warning(f"Job {job.id}: lease lost while running, result discarded")
+                        self._drop(job)
+                        continue
+                except Exception:
+                    logger.exception(f"Job {job.id}: could not persist result")
+            job.touch()
+
+    async def _claim(self, job: Job) -> bool:
+        try:
+            claimed = await self.store.claim(job.id, self.owner, self.lease)
+        except Exception:
+            logger.exception(f"Job {job.id}: could not claim")
+            return False
+        if not claimed:
+            # Another worker process owns it; serve reads from the store from now on
+            self._drop(job)
+        return claimed
+
+    def _drop(self, job: Job) -> None:
+        """Stop holding a job another process owns; wakes its subscribers so they follow it through the store."""
+        self._jobs.pop(job.id, None)
+        job.touch()
+
+    async def _pick_up_queued(self) -> int:
+        """Queue every stored job that is queued, or was running under an expired lease, and is not queued here yet."""
+        added = 0
+        for job in await self.store.requeue_expired():
+            if job.id not in self._jobs:
+                self._jobs[job.id] = job
+                self._queue.put_nowait(job.id)
+                added += 1
+        return added
+
+    async def _lease_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            running = {job.id: "".join(job.tokens) for job in self._jobs.values() if job.status == RUNNING}
+            try:
+                if running:
+                    for job_id in await self.store.renew(self.owner, self.lease, running):
+                        logger.warning(f"Job {job_id}: lease lost, another worker may run it again")
+                await self._pick_up_queued()
+            except Exception:
+                logger.exception("Job lease renewal failed")
+
+    async def _purge_loop(self) -> None:
+        while True:
+            await asyncio.sleep(60)
+            now = time.time()
+            for job_id in [j.id for j in self._jobs.values() if j.expires_at is not None and j.expires_at <= now]:
+                del self._jobs[job_id]
+            if self.store is not None:
+                try:
+                    await self.store.purge()
+                except Exception:
+                    logger.exception("Job store purge failed")
+
+
+job_queue = JobQueue(
+    JOB_WORKERS,
+    JOB_QUEUE_MAX_PENDING,
+    JOB_RESULT_TTL_SECONDS,
+    SQLiteJobStore(JOB_STORE_PATH) if JOB_STORE == "sqlite" else None,
+)
+CallbackMetric(
+    "qa_jobs", "Background Q&A jobs held by this process, by status", ("status",),
+    lambda: {(status,): count for status, count in job_queue.stats().items() if status in (QUEUED, RUNNING, DONE, FAILED)},
+)
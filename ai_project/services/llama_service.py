@@ -1,10 +1,21 @@
-import requests
-from config import OLLAMA_BASE_URL, OLLAMA_MODEL
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-def generate_questions_and_answers(jd_text: str, resume_text: str) -> str:
-    """Call Ollama LLaMA model with JD + Resume and return questions/answers."""
-    prompt = f"""
-You are an interviewer preparing for a Data Quality Analyst interview. 
+from config import OLLAMA_MODEL, PROMPT_TOKEN_BUDGET, PROMPT_JD_SHARE, CHARS_PER_TOKEN
+from services.admission import admission
+from services.ollama_client import get_ollama_client, OllamaError
+from services.qa_cache import qa_cache, make_cache_key
+from services.prompt_builder import prepare_documents, estimate_tokens
+from utils.logger import logger
+from utils.metrics import CallbackMetric
+
+# Bump whenever the prompt template or prompt_builder changes so cached results from the old prompt are not reused.
+# The budget settings decide how the documents are cut, so a change to them is a new prompt version as well.
+PROMPT_VERSION = f"3:{PROMPT_TOKEN_BUDGET}:{PROMPT_JD_SHARE}:{CHARS_PER_TOKEN}"
+
+PROMPT_TEMPLATE = """
+You are an interviewer preparing for a Data Quality Analyst interview.
 Here is the Job Description:
 {jd_text}
 
@@ -12,34 +23,191 @@ Here is the Candidate Resume:
 {resume_text}
 
 Your task:
-- Generate 10–15 interview questions tailored to the role AND the candidate’s background. 
+- Generate 10–15 interview questions tailored to the role AND the candidate’s background.
 - For each question, provide a strong sample answer that demonstrates the candidate’s likely knowledge.
-- Cover: SQL, ETL testing, data quality assurance, Power BI validation, defect management, 
+- Cover: SQL, ETL testing, data quality assurance, Power BI validation, defect management,
 data warehouse concepts, communication, collaboration.
 - Keep answers concise (2–5 sentences), but technically correct.
 """
 
-    url = f"{OLLAMA_BASE_URL}/api/generate"
-    response = requests.post(
-        url,
-        json={"model": OLLAMA_MODEL, "prompt": prompt},
-        stream=True
-    )
-
-    if response.status_code != 200:
-        raise Exception(f"Ollama error: {response.text}")
-
-    # Collect streamed chunks into a single text
-    output = ""
-    for line in response.iter_lines():
-        if line:
-            data = line.decode("utf-8")
-            if data.startswith("{"):
-                try:
-                    import json
-                    chunk = json.loads(data)
-                    if "response" in chunk:
-                        output += chunk["response"]
-                except Exception:
-                    pass
-    return {"prompt": prompt.strip(), "questions_and_answers": output.strip()}
+
+def build_prompt(jd_text: str, resume_text: str) -> Tuple[str, Dict[str, int]]:
+    """
+    Build the interviewer prompt from JD + Resume text, normalized and fitted to the token budget.
+    Returns the prompt and its before/after token counts.
+    """
+    jd_text, resume_text, token_stats = prepare_documents(jd_text, resume_text)
+    prompt = PROMPT_TEMPLATE.format(jd_text=jd_text, resume_text=resume_text)
+    token_stats["prompt_tokens"] = estimate_tokens(prompt)
+    logger.info(f"Prompt built: {token_stats}")
+    return prompt, token_stats
+
+
+class _Flight:
+    """One in-progress generation shared by every concurrent caller with the same prompt hash."""
+
+    def __init__(self, prompt: str, token_stats: Dict[str, int]):
+        self.prompt = prompt
+        self.token_stats = token_stats
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    @property
+    def result(self) -> dict:
+        return {
+            "prompt": self.prompt.strip(),
+            "questions_and_answers": "".join(self.tokens).strip(),
+            "prompt_tokens": self.token_stats,
+        }
+
+
+_flights: Dict[str, _Flight] = {}
+_coalescing_stats = {"generations": 0, "coalesced": 0}
+
+
+async def _drive(key: str, flight: _Flight) -> None:
+    try:
+        async for token in get_ollama_client().stream_generate(OLLAMA_MODEL, flight.prompt):
+            flight.tokens.append(token)
+            flight.notify()
+        await qa_cache.set(key, flight.result)
+    except BaseException as e:
+        flight.error = e
+        if not isinstance(e, Exception):
+            raise
+    finally:
+        flight.done = True
+        _flights.pop(key, None)
+        flight.notify()
+
+
+def _start_flight(key: str, jd_text: str, resume_text: str, username: str) -> _Flight:
+    """Start the generation for `key`; the caller already holds an admission slot, which the flight releases."""
+    try:
+        flight = _Flight(*build_prompt(jd_text, resume_text))
+    except BaseException:
+        admission.release(username)
+        raise
+    _flights[key] = flight
+    _coalescing_stats["generations"] += 1
+    started = time.monotonic()
+    flight.task = asyncio.create_task(_drive(key, flight))
+    # a done callback also runs for a task cancelled before it first ran, so the slot is never leaked
+    flight.task.add_done_callback(lambda _: admission.release(username, time.monotonic() - started))
+    return flight
+
+
+async def _cached_or_flight(
+    key: str, jd_text: str, resume_text: str, username: str, background: bool
+) -> Tuple[Optional[dict], Optional[_Flight]]:
+    """
+    The cached result, or the generation to follow: a running one is joined, otherwise one is started
+    once admission control grants a slot (raises Overloaded). Cache hits and joins never take a slot.
+    """
+    cached = await qa_cache.get(key)
+    if cached is not None:
+        return cached, None
+    if key not in _flights:
+        await admission.acquire(username, background)
+        # while this request waited, another may have started the same generation or cached its result;
+        # a finished generation is always in the in-process tier, and this lookup was already counted above
+        cached = None if key in _flights else qa_cache.peek(key)
+        if cached is None and key not in _flights:
+            return None, _start_flight(key, jd_text, resume_text, username)
+        admission.release(username)
+        if cached is not None:
+            return cached, None
+    _coalescing_stats["coalesced"] += 1
+    return None, _flights[key]
+
+
+async def _follow(flight: _Flight) -> AsyncIterator[str]:
+    """
+    Yield the flight's tokens from the start, then live as they arrive.
+    When the last follower leaves before the end, the upstream generation is cancelled.
+    """
+    flight.subscribers += 1
+    sent = 0
+    try:
+        while True:
+            changed = flight.changed
+            while sent < len(flight.tokens):
+                sent += 1
+                yield flight.tokens[sent - 1]
+            if flight.done:
+                if isinstance(flight.error, asyncio.CancelledError):
+                    raise OllamaError("Generation was cancelled")
+                if flight.error is not None:
+                    raise flight.error
+                return
+            await changed.wait()
+    finally:
+        flight.subscribers -= 1
+        if flight.subscribers == 0 and not flight.done and flight.task is not None:
+            flight.task.cancel()
+
+
+def coalescing_stats() -> Dict[str, int]:
+    return {**_coalescing_stats, "in_flight": len(_flights)}
+
+
+CallbackMetric("qa_generations_total", "Ollama generations started for Q&A", (), lambda: {(): _coalescing_stats["generations"]}, "counter")
+CallbackMetric(
+    "qa_generations_coalesced_total", "Q&A requests that joined a running generation", (),
+    lambda: {(): _coalescing_stats["coalesced"]}, "counter",
+)
+CallbackMetric("qa_generations_in_flight", "Q&A generations currently running", (), lambda: {(): len(_flights)})
+
+
+async def generate_questions_and_answers(
+    jd_text: str, resume_text: str, username: str = "", background: bool = False
+) -> dict:
+    """
+    Call Ollama LLaMA model with JD + Resume and return questions/answers.
+    Served from cache when possible; concurrent identical requests share one generation.
+    A new generation counts against `username`'s admission share and may raise Overloaded.
+    """
+    key = make_cache_key(jd_text, resume_text, OLLAMA_MODEL, PROMPT_VERSION)
+    cached, flight = await _cached_or_flight(key, jd_text, resume_text, username, background)
+    if cached is not None:
+        return cached
+
+    async for _ in _follow(flight):
+        pass
+    return flight.result
+
+
+async def _yield_cached(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def start_questions_and_answers(
+    jd_text: str, resume_text: str, username: str = "", background: bool = False
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of generate_questions_and_answers: admission happens here, so an Overloaded
+    error surfaces before a response is started; the returned iterator yields tokens as Ollama produces them.
+    A cached result is yielded as a single chunk; a caller joining a running generation
+    first receives the tokens produced so far.
+    """
+    key = make_cache_key(jd_text, resume_text, OLLAMA_MODEL, PROMPT_VERSION)
+    cached, flight = await _cached_or_flight(key, jd_text, resume_text, username, background)
+    if cached is not None:
+        return _yield_cached(cached["questions_and_answers"])
+    return _follow(flight)
+
+
+async def stream_questions_and_answers(
+    jd_text: str, resume_text: str, username: str = "", background: bool = False
+) -> AsyncIterator[str]:
+    """Same as start_questions_and_answers, as a single async generator."""
+    async for token in await start_questions_and_answers(jd_text, resume_text, username, background):
+        yield token
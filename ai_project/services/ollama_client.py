@@ -0,0 +1,308 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_BACKENDS,
+    OLLAMA_HEALTH_INTERVAL_SECONDS,
+    OLLAMA_HEALTH_TIMEOUT_SECONDS,
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_READ_TIMEOUT,
+    OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_MAX_KEEPALIVE,
+    OLLAMA_KEEPALIVE_EXPIRY,
+)
+from utils.logger import logger
+from utils.metrics import (
+    CallbackMetric,
+    llm_generation_duration,
+    llm_time_to_first_token,
+    llm_tokens,
+    llm_tokens_per_second,
+)
+
+
+class OllamaError(Exception):
+    """Raised when Ollama is unreachable or answers with an error."""
+
+
+class OllamaUnavailable(OllamaError):
+    """The backend could not be reached or failed on its side (5xx); another backend may succeed."""
+
+
+class OllamaClient:
+    """Async Ollama client sharing one keep-alive connection pool across requests."""
+
+    def __init__(self, base_url: str = OLLAMA_BASE_URL):
+        # imported here: the client is created on the first Q&A request, not at worker startup
+        import httpx
+
+        self.base_url = base_url.rstrip("/")
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(
+                connect=OLLAMA_CONNECT_TIMEOUT,
+                read=OLLAMA_READ_TIMEOUT,
+                write=OLLAMA_CONNECT_TIMEOUT,
+                pool=OLLAMA_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+                keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    async def stream_generate(self, model: str, prompt: str) -> AsyncIterator[str]:
+        """
+        Yield response tokens from /api/generate as Ollama streams them.
+        Closing the generator (e.g. on client disconnect) closes the upstream request.
+        Records time to first token, total time, token count and decode throughput per model.
+        """
+        import httpx
+
+        started = time.perf_counter()
+        first_token_at = None
+        tokens = 0
+        outcome = "error"
+        try:
+            async with self._client.stream(
+                "POST", "/api/generate", json={"model": model, "prompt": prompt}
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    error = OllamaUnavailable if response.status_code >= 500 else OllamaError
+                    raise error(f"Ollama error ({response.status_code}): {body.decode('utf-8', 'replace')}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("{"):
+                        continue
+                    try:
+                        chunk = json.loads(line)
+                    except ValueError:
+                        continue
+                    if chunk.get("error"):
+                        raise OllamaError(f"Ollama error: {chunk['error']}")
+                    if chunk.get("response"):
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            llm_time_to_first_token.labels(model).observe(first_token_at - started)
+                        tokens += 1
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+            outcome = "ok"
+        except httpx.TransportError as e:
+            raise OllamaUnavailable(f"Ollama request to {self.base_url} failed: {e!r}") from e
+        except httpx.HTTPError as e:
+            raise OllamaError(f"Ollama request failed: {e!r}") from e
+        except (GeneratorExit, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        finally:
+            finished = time.perf_counter()
+            llm_generation_duration.labels(model, outcome).observe(finished - started)
+            if tokens:
+                llm_tokens.labels(model).inc(tokens)
+                if outcome == "ok" and tokens > 1 and finished > first_token_at:
+                    llm_tokens_per_second.labels(model).observe((tokens - 1) / (finished - first_token_at))
+
+    async def generate(self, model: str, prompt: str) -> str:
+        """Run a generation to completion and return the full text."""
+        parts = [token async for token in self.stream_generate(model, prompt)]
+        return "".join(parts)
+
+    async def probe(self) -> float:
+        """Seconds taken by a GET /api/tags; raises OllamaUnavailable when it fails."""
+        import httpx
+
+        started = time.perf_counter()
+        try:
+            response = await self._client.get("/api/tags", timeout=OLLAMA_HEALTH_TIMEOUT_SECONDS)
+        except httpx.HTTPError as e:
+            raise OllamaUnavailable(f"probe of {self.base_url} failed: {e!r}") from e
+        if response.status_code != 200:
+            raise OllamaUnavailable(f"probe of {self.base_url} answered {response.status_code}")
+        return time.perf_counter() - started
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class _Backend:
+    def __init__(self, url: str, max_concurrent: int):
+        self.client = OllamaClient(url)
+        self.url = self.client.base_url
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.healthy = True
+        self.latency = 0.0  # smoothed probe round trip, seconds
+        self.last_error: Optional[str] = None
+        self.generations = 0
+        self.failures = 0
+
+    def mark_down(self, error: Exception) -> None:
+        if self.healthy:
+            logger.warning(f"Ollama backend {self.url} marked down: {error}")
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)
+
+
+class OllamaPool:
+    """
+    Spreads generations over several Ollama backends, each with its own connection pool and
+    concurrency cap. A generation goes to the healthy backend with the lowest load (in flight / cap,
+    then probe latency) and waits when every healthy backend is at its cap. A backend that fails to
+    connect or answers 5xx is marked down and the generation retried on another one, as long as no
+    token has been sent yet. Down backends get no work until a background probe succeeds again.
+    """
+
+    def __init__(self, backends: Dict[str, int], health_interval: float = OLLAMA_HEALTH_INTERVAL_SECONDS):
+        self.backends = [_Backend(url, max_concurrent) for url, max_concurrent in backends.items()]
+        self.health_interval = health_interval
+        self.failovers = 0
+        self._changed = asyncio.Event()
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _start_probes(self) -> None:
+        if self._probe_task is None and self.health_interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.gather(*(self._probe(backend) for backend in self.backends))
+            await asyncio.sleep(self.health_interval)
+
+    async def _probe(self, backend: _Backend) -> None:
+        try:
+            latency = await backend.client.probe()
+        except OllamaUnavailable as e:
+            backend.mark_down(e)
+            return
+        except Exception as e:
+            # anything else (a closed client, a malformed URL) must not end the probe loop,
+            # the only way a backend marked down comes back
+            if backend.healthy:
+                logger.exception(f"Ollama backend {backend.url}: probe failed")
+            backend.mark_down(e)
+            return
+        backend.latency = latency if not backend.latency else 0.8 * backend.latency + 0.2 * latency
+        if not backend.healthy:
+            logger.info(f"Ollama backend {backend.url} is back up")
+            backend.healthy = True
+            backend.last_error = None
+            self._notify()
+
+    async def _acquire(self, tried: Set[str]) -> _Backend:
+        while True:
+            candidates = [b for b in self.backends if b.url not in tried]
+            # with every candidate marked down, try them anyway rather than fail without a request
+            healthy = [b for b in candidates if b.healthy] or candidates
+            free = [b for b in healthy if b.in_flight < b.max_concurrent]
+            if free:
+                backend = min(free, key=lambda b: (b.in_flight / b.max_concurrent, b.latency))
+                backend.in_flight += 1
+                tried.add(backend.url)
+                return backend
+            await self._changed.wait()
+
+    def _release(self, backend: _Backend) -> None:
+        backend.in_flight -= 1
+        self._notify()
+
+    async def stream_generate(self, model: str, prompt: str) -> AsyncIterator[str]:
+        """Same contract as OllamaClient.stream_generate, on the least-loaded healthy backend."""
+        self._start_probes()
+        tried: Set[str] = set()
+        while True:
+            backend = await self._acquire(tried)
+            backend.generations += 1
+            sent_token = False
+            try:
+                async for token in backend.client.stream_generate(model, prompt):
+                    sent_token = True
+                    yield token
+                return
+            except OllamaUnavailable as e:
+                backend.mark_down(e)
+                if sent_token:
+                    raise
+                if len(tried) == len(self.backends):
+                    raise OllamaUnavailable(f"All {len(self.backends)} Ollama backends failed, last: {e}") from e
+                self.failovers += 1
+                logger.warning(f"Ollama generation failing over from {backend.url}")
+            finally:
+                self._release(backend)
+
+    async def generate(self, model: str, prompt: str) -> str:
+        """Run a generation to completion and return the full text."""
+        parts = [token async for token in self.stream_generate(model, prompt)]
+        return "".join(parts)
+
+    def stats(self) -> List[Dict[str, object]]:
+        return [
+            {
+                "url": b.url,
+                "healthy": b.healthy,
+                "in_flight": b.in_flight,
+                "max_concurrent": b.max_concurrent,
+                "probe_latency_ms": round(b.latency * 1000, 1),
+                "generations": b.generations,
+                "failures": b.failures,
+                "last_error": b.last_error,
+            }
+            for b in self.backends
+        ]
+
+    async def aclose(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+        await asyncio.gather(*(b.client.aclose() for b in self.backends))
+
+
+_client: Optional[OllamaPool] = None
+
+
+def get_ollama_client() -> OllamaPool:
+    """Return the process-wide pool over OLLAMA_BACKENDS, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = OllamaPool(OLLAMA_BACKENDS)
+    return _client
+
+
+def backend_stats() -> List[Dict[str, object]]:
+    """Per-backend health and load; empty until the first generation creates the pool."""
+    return _client.stats() if _client is not None else []
+
+
+async def close_ollama_client() -> None:
+    """Close the shared client (call at shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Ollama client closed")
+
+
+def _per_backend(field: str):
+    return lambda: {(b["url"],): float(b[field]) for b in backend_stats()}
+
+
+CallbackMetric("ollama_backend_up", "1 while the backend passes health probes", ("backend",), _per_backend("healthy"))
+CallbackMetric("ollama_backend_in_flight", "Generations running on the backend", ("backend",), _per_backend("in_flight"))
+CallbackMetric(
+    "ollama_backend_probe_latency_ms", "Smoothed health probe round trip", ("backend",), _per_backend("probe_latency_ms")
+)
+CallbackMetric(
+    "ollama_failovers_total", "Generations retried on another backend before their first token", (),
+    lambda: {(): _client.failovers if _client is not None else 0}, "counter",
+)
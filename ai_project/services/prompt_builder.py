@@ -0,0 +1,168 @@
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+from config import PROMPT_TOKEN_BUDGET, PROMPT_JD_SHARE, CHARS_PER_TOKEN
+
+_WHITESPACE = re.compile(r"[ \t •·▪●]+")
+_BOILERPLATE = re.compile(
+    r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+|\d{1,3}|confidential|curriculum vitae|resume|r[ée]sum[ée])$",
+    re.IGNORECASE,
+)
+# A line repeated this many times across the document is a running header/footer.
+_REPEATED_LINE_MIN = 3
+
+RESUME_SECTION_PRIORITY: Sequence[Tuple[str, int]] = (
+    ("skill", 0),
+    ("experience", 1),
+    ("employment", 1),
+    ("project", 2),
+    ("responsibilit", 2),
+    ("certification", 3),
+    ("achievement", 3),
+    ("education", 4),
+    ("objective", 5),
+    ("summary", 5),
+)
+JD_SECTION_PRIORITY: Sequence[Tuple[str, int]] = (
+    ("responsibilit", 0),
+    ("requirement", 0),
+    ("qualification", 0),
+    ("skill", 0),
+    ("overview", 1),
+    ("title", 1),
+    ("benefit", 4),
+    ("about", 4),
+)
+_DEFAULT_PRIORITY = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Fast token estimate (characters / CHARS_PER_TOKEN); close enough for budgeting LLaMA-family prompts."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def normalize_document(text: str) -> str:
+    """
+    Clean extracted PDF text: collapse whitespace and bullet glyphs, drop page numbers
+    and similar boilerplate, running headers/footers and duplicate lines, and squeeze blank runs.
+    Section headings are kept even when repeated.
+    """
+    lines = [_WHITESPACE.sub(" ", line).strip() for line in text.splitlines()]
+    counts = Counter(line.lower() for line in lines if line)
+    seen = set()
+    out: List[str] = []
+    for line in lines:
+        if not line:
+            if out and out[-1]:
+                out.append("")
+            continue
+        key = line.lower()
+        if _BOILERPLATE.match(line):
+            continue
+        # section headings legitimately repeat (e.g. "Responsibilities:" per job); other repeats are noise
+        if not _is_heading(line) and (counts[key] >= _REPEATED_LINE_MIN or key in seen):
+            continue
+        seen.add(key)
+        out.append(line)
+    return "\n".join(out).strip()
+
+
+def _is_heading(line: str) -> bool:
+    if not line or len(line) > 60:
+        return False
+    letters = [c for c in line if c.isalpha()]
+    if not letters:
+        return False
+    return line.endswith(":") or all(c.isupper() for c in letters)
+
+
+def _split_sections(text: str) -> List[List[str]]:
+    sections: List[List[str]] = [[]]
+    for line in text.split("\n"):
+        if _is_heading(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return sections
+
+
+def _priority(section: List[str], priorities: Sequence[Tuple[str, int]]) -> int:
+    heading = section[0].lower() if _is_heading(section[0]) else ""
+    for keyword, rank in priorities:
+        if keyword in heading:
+            return rank
+    return _DEFAULT_PRIORITY
+
+
+def _truncate(line: str, budget: int) -> str:
+    """The longest prefix of `line` within `budget` tokens, ending at a word boundary where there is one."""
+    cut = line[: max(budget, 0) * CHARS_PER_TOKEN]
+    if len(cut) < len(line) and " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip()
+
+
+def fit_to_budget(text: str, budget: int, priorities: Sequence[Tuple[str, int]]) -> str:
+    """
+    Keep whole sections in priority order while they fit in `budget` tokens; the first section
+    that does not fit is cut at a line boundary, or inside its first line when not even that fits
+    (pypdf often extracts a whole document as one line). Kept sections stay in document order.
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    sections = _split_sections(text)
+    order = sorted(range(len(sections)), key=lambda i: (_priority(sections[i], priorities), i))
+    kept: Dict[int, List[str]] = {}
+    remaining = budget
+    for i in order:
+        lines: List[str] = []
+        for line in sections[i]:
+            cost = estimate_tokens(line) + 1
+            if cost > remaining:
+                if not lines or (len(lines) == 1 and _is_heading(lines[0])):
+                    cut = _truncate(line, remaining - 1)
+                    if cut:
+                        lines.append(cut)
+                        remaining = 0
+                break
+            lines.append(line)
+            remaining -= cost
+        if len(lines) == 1 and len(sections[i]) > 1 and _is_heading(lines[0]):
+            remaining += estimate_tokens(lines[0]) + 1  # a heading without its body is useless
+            lines = []
+        if lines:
+            kept[i] = lines
+        if remaining <= 0:
+            break
+    return "\n".join(line for i in sorted(kept) for line in kept[i])
+
+
+def prepare_documents(jd_text: str, resume_text: str, budget: int = PROMPT_TOKEN_BUDGET) -> Tuple[str, str, Dict[str, int]]:
+    """
+    Normalize JD + resume and fit them into `budget` tokens together. The JD gets
+    PROMPT_JD_SHARE of the budget; whatever one document does not need goes to the other.
+    Returns (jd, resume, token counts before/after).
+    """
+    jd_clean = normalize_document(jd_text)
+    resume_clean = normalize_document(resume_text)
+    jd_tokens = estimate_tokens(jd_clean)
+    resume_tokens = estimate_tokens(resume_clean)
+
+    jd_budget = int(budget * PROMPT_JD_SHARE)
+    resume_budget = budget - jd_budget
+    if jd_tokens < jd_budget:
+        resume_budget += jd_budget - jd_tokens
+        jd_budget = jd_tokens
+    elif resume_tokens < resume_budget:
+        jd_budget += resume_budget - resume_tokens
+        resume_budget = resume_tokens
+
+    jd_fitted = fit_to_budget(jd_clean, jd_budget, JD_SECTION_PRIORITY)
+    resume_fitted = fit_to_budget(resume_clean, resume_budget, RESUME_SECTION_PRIORITY)
+    stats = {
+        "jd_tokens_raw": estimate_tokens(jd_text),
+        "jd_tokens": estimate_tokens(jd_fitted),
+        "resume_tokens_raw": estimate_tokens(resume_text),
+        "resume_tokens": estimate_tokens(resume_fitted),
+    }
+    return jd_fitted, resume_fitted, stats
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi_cache import FastAPICache
+
+from config import QA_CACHE_MAX_ENTRIES, QA_CACHE_TTL_SECONDS, QA_CACHE_PERSIST, QA_CACHE_SQLITE_PATH
+from utils.logger import logger
+from utils.metrics import CallbackMetric
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so re-extracted copies of the same PDF hash identically."""
+    return " ".join(text.split())
+
+
+def make_cache_key(jd_text: str, resume_text: str, model: str, prompt_version: str) -> str:
+    """Content-addressed key for one (JD, resume, model, prompt version) combination."""
+    h = hashlib.sha256()
+    for part in (model, prompt_version, normalize_text(jd_text), normalize_text(resume_text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class SQLitePersistentTier:
+    """Persistent tier stored in a local SQLite file (survives restarts, shared by workers on one host)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._table_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        if not self._table_ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS qa_results (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._table_ready = True
+        return conn
+
+    def _get(self, key: str) -> Optional[str]:
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT value FROM qa_results WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: int) -> None:
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO qa_results (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            conn.execute("DELETE FROM qa_results WHERE expires_at <= ?", (time.time(),))
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+
+class FastAPICacheTier:
+    """Persistent tier reusing the backend configured by utils/cache_utils.init_cache (memory or redis)."""
+
+    namespace = "qa-result"
+
+    def _key(self, key: str) -> str:
+        return f"{FastAPICache.get_prefix()}:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        raw = await FastAPICache.get_backend().get(self._key(key))
+        if raw is None:
+            return None
+        return raw.decode("utf-8") if isinstance(raw, bytes) else raw
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await FastAPICache.get_backend().set(self._key(key), value.encode("utf-8"), ttl)
+
+
+class QAResultCache:
+    """
+    Two-level cache for generated Q&A results:
+    an in-process LRU with TTL, optionally backed by a persistent tier.
+    """
+
+    def __init__(self, max_entries: int, ttl: int, persistent=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+
+        if self.persistent is not None:
+            try:
+                raw = await self.persistent.get(key)
+            except Exception:
+                logger.warning("Q&A cache: persistent tier read failed", exc_info=True)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._remember(key, value)
+                self.persistent_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """In-process lookup that leaves the hit/miss counters alone, for re-checking a key already counted."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._remember(key, value)
+        if self.persistent is not None:
+            try:
+                await self.persistent.set(key, json.dumps(value), self.ttl)
+            except Exception:
+                logger.warning("Q&A cache: persistent tier write failed", exc_info=True)
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            "persistent_tier": QA_CACHE_PERSIST,
+        }
+
+
+def _build_persistent_tier():
+    if QA_CACHE_PERSIST == "sqlite":
+        return SQLitePersistentTier(QA_CACHE_SQLITE_PATH)
+    if QA_CACHE_PERSIST == "backend":
+        return FastAPICacheTier()
+    return None
+
+
+qa_cache = QAResultCache(QA_CACHE_MAX_ENTRIES, QA_CACHE_TTL_SECONDS, _build_persistent_tier())
+CallbackMetric(
+    "qa_cache_lookups_total", "Q&A result cache lookups by outcome", ("result",),
+    lambda: {("hit",): qa_cache.hits, ("persistent_hit",): qa_cache.persistent_hits, ("miss",): qa_cache.misses},
+    "counter",
+)
@@ -1,56 +1,316 @@
-from typing import List, Optional
+import base64
+import itertools
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from models.record_model import Record, OptionType, StatusType
-from schemas.record_schemas import RecordCreate, RecordUpdate
+from sqlalchemy import delete, func, insert, literal_column, select, tuple_
+from models.record_model import Record, OptionType, StatusType, records_fts
+from schemas.record_schemas import RecordCreate, RecordUpdate, BulkCreate, BulkUpdate
 
-def create_record(db: Session, record_in: RecordCreate) -> Record:
-    """Create and persist a new Record."""
-    rec = Record(
+def _new_record(record_in: RecordCreate) -> Record:
+    return Record(
         option_type=record_in.option_type,
         description=record_in.description,
         status=record_in.status,
     )
-    db.add(rec)
-    db.commit()
-    db.refresh(rec)
-    return rec
 
-def get_record(db: Session, record_id: int) -> Optional[Record]:
-    """Get a record by id."""
-    return db.query(Record).filter(Record.id == record_id).first()
+RECORD_COLUMNS = ("id", "created_at", "option_type", "description", "status")
+_record_columns = tuple(getattr(Record, name) for name in RECORD_COLUMNS)
+
+
+def record_to_dict(row: Any) -> Dict[str, Any]:
+    """
+    Project a Record (or a row of RECORD_COLUMNS) straight to the RecordOut shape.
+    Rows come from our own schema, so there is nothing for per-object Pydantic validation to catch.
+    """
+    return {
+        "id": row.id,
+        "created_at": row.created_at,
+        "option_type": row.option_type.value,
+        "description": row.description,
+        "status": row.status.value,
+    }
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> list:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+
+def encode_cursor(record: Any) -> str:
+    """Opaque page cursor: the (created_at, id) of the last record on the page."""
+    return _encode([record.created_at.isoformat(), record.id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, record_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(record_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _list_statement(
+    skip: int,
+    limit: int,
+    option_type: Optional[OptionType],
+    status: Optional[StatusType],
+    after: Optional[Tuple[datetime, int]],
+    columns: Optional[Sequence[Any]] = None,
+):
+    stmt = select(*columns) if columns else select(Record)
+    if option_type:
+        stmt = stmt.where(Record.option_type == option_type)
+    if status:
+        stmt = stmt.where(Record.status == status)
+    if after is not None:
+        stmt = stmt.where(tuple_(Record.created_at, Record.id) > tuple_(*after))
+    stmt = stmt.order_by(Record.created_at, Record.id)
+    if skip:
+        stmt = stmt.offset(skip)
+    return stmt.limit(limit)
+
+
+def _page(rows: list, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Split the limit + 1 rows fetched for a page into the projected page and the next cursor."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    return [record_to_dict(row) for row in rows], next_cursor
+
+
+class InvalidSearchQuery(ValueError):
+    pass
+
+
+_SEARCH_TERM = re.compile(r"(\w+)(\*?)")
+
+
+def to_match_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query: every word becomes a quoted term (all must match),
+    a trailing `*` keeps prefix matching. FTS5 operators and punctuation in the input are not interpreted.
+    """
+    terms = [f'"{word}"{star}' for word, star in _SEARCH_TERM.findall(q)]
+    if not terms:
+        raise InvalidSearchQuery("Search query has no searchable words")
+    return " ".join(terms)
+
+
+def _search_statement(
+    match: str,
+    limit: int,
+    option_type: Optional[OptionType],
+    status: Optional[StatusType],
+    after: Optional[Tuple[float, int]],
+):
+    # rank is bm25(): lower is more relevant
+    stmt = (
+        select(*_record_columns, records_fts.c.rank)
+        .join(records_fts, records_fts.c.rowid == Record.id)
+        .where(literal_column("records_fts").op("MATCH")(match))
+    )
+    if option_type:
+        stmt = stmt.where(Record.option_type == option_type)
+    if status:
+        stmt = stmt.where(Record.status == status)
+    if after is not None:
+        stmt = stmt.where(tuple_(records_fts.c.rank, Record.id) > tuple_(*after))
+    return stmt.order_by(records_fts.c.rank, Record.id).limit(limit)
 
-def list_records(
-    db: Session,
+
+def _search_args(q: str, cursor: Optional[str]) -> Tuple[str, Optional[Tuple[float, int]]]:
+    match = to_match_query(q)
+    if not cursor:
+        return match, None
+    try:
+        rank, record_id = _decode(cursor)
+        return match, (float(rank), int(record_id))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def _search_page(rows: list, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode([rows[-1].rank, rows[-1].id])
+    return [record_to_dict(row) for row in rows], next_cursor
+
+
+def iter_record_rows(
+    bind: Engine,
     *,
-    skip: int = 0,
-    limit: int = 100,
+    chunk_rows: int = 1000,
     option_type: Optional[OptionType] = None,
-    status: Optional[StatusType] = None
-) -> List[Record]:
-    """List records with optional filters."""
-    q = db.query(Record)
+    status: Optional[StatusType] = None,
+) -> Iterator[List[Tuple[Any, ...]]]:
+    """
+    Yield every matching record as chunks of plain tuples (RECORD_COLUMNS order), ordered by (created_at, id).
+    Rows come from a server-side cursor `chunk_rows` at a time, so memory stays flat whatever the table size.
+    Uses its own connection because the caller (a streaming response) outlives the request's session.
+    """
+    stmt = select(*_record_columns)
     if option_type:
-        q = q.filter(Record.option_type == option_type)
+        stmt = stmt.where(Record.option_type == option_type)
     if status:
-        q = q.filter(Record.status == status)
-    return q.offset(skip).limit(limit).all()
+        stmt = stmt.where(Record.status == status)
+    stmt = stmt.order_by(Record.created_at, Record.id)
+    with bind.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_rows).execute(stmt)
+        for rows in result.partitions():
+            yield [tuple(row) for row in rows]
 
-def update_record(db: Session, record: Record, updates: RecordUpdate) -> Record:
-    """Apply updates and persist."""
+def _apply_updates(record: Record, updates: RecordUpdate) -> None:
     if updates.option_type is not None:
         record.option_type = updates.option_type
     if updates.description is not None:
         record.description = updates.description
     if updates.status is not None:
         record.status = updates.status
+
+def apply_bulk_batch(
+    db: Session, batch: Sequence[Tuple[int, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Tuple[int, Any, Any]]]:
+    """
+    Apply one batch of (index, BulkCreate | BulkUpdate | BulkDelete) with one executemany-style
+    statement per kind: creates, then updates, then deletes. Does not commit; the caller owns the transaction.
+    The batch must not touch the same id twice. Returns per-item results and the
+    (id, option_type, status) of every row affected, before and after updates.
+    """
+    results: List[Dict[str, Any]] = []
+    touched: List[Tuple[int, Any, Any]] = []
+
+    creates = [(i, op) for i, op in batch if isinstance(op, BulkCreate)]
+    if creates:
+        rows = [
+            {
+                "option_type": op.data.option_type,
+                "description": op.data.description,
+                "status": op.data.status or StatusType.ACTIVE,
+            }
+            for _, op in creates
+        ]
+        # one executemany; asking for each primary key back would make it one INSERT per row.
+        # The transaction holds SQLite's write lock, so the new rowids are consecutive up to last_insert_rowid().
+        db.execute(insert(Record.__table__), rows)
+        first_id = db.execute(select(func.last_insert_rowid())).scalar() - len(rows) + 1
+        for record_id, (i, _), row in zip(itertools.count(first_id), creates, rows):
+            results.append({"index": i, "op": "create", "id": record_id, "ok": True})
+            touched.append((record_id, row["option_type"], row["status"]))
+
+    targets = [(i, op) for i, op in batch if not isinstance(op, BulkCreate)]
+    if not targets:
+        return results, touched
+    existing = {
+        row.id: (row.option_type, row.status)
+        for row in db.query(Record.id, Record.option_type, Record.status).filter(
+            Record.id.in_([op.id for _, op in targets])
+        )
+    }
+
+    updates: List[Dict[str, Any]] = []
+    deletes: List[int] = []
+    for i, op in targets:
+        kind = "update" if isinstance(op, BulkUpdate) else "delete"
+        if op.id not in existing:
+            results.append({"index": i, "op": kind, "id": op.id, "ok": False, "error": "Record not found"})
+            continue
+        option_type, status = existing[op.id]
+        touched.append((op.id, option_type, status))
+        if isinstance(op, BulkUpdate):
+            changes = op.data.model_dump(exclude_none=True)
+            if changes:
+                updates.append({"id": op.id, **changes})
+                touched.append((op.id, changes.get("option_type", option_type), changes.get("status", status)))
+        else:
+            deletes.append(op.id)
+        results.append({"index": i, "op": kind, "id": op.id, "ok": True})
+
+    if updates:
+        db.bulk_update_mappings(Record, updates)
+    if deletes:
+        db.execute(delete(Record).where(Record.id.in_(deletes)).execution_options(synchronize_session=False))
+    return results, touched
+
+
+# Record CRUD for the routes. `db` is an AsyncSession, or database.ThreadedSession when DB_ASYNC is off.
+
+async def create_record_async(db: AsyncSession, record_in: RecordCreate) -> Record:
+    """Create and persist a new Record."""
+    rec = _new_record(record_in)
+    db.add(rec)
+    await db.commit()
+    await db.refresh(rec)
+    return rec
+
+async def get_record_async(db: AsyncSession, record_id: int) -> Optional[Record]:
+    """Get a record by id."""
+    return await db.get(Record, record_id)
+
+async def get_record_dict_async(db: AsyncSession, record_id: int) -> Optional[Dict[str, Any]]:
+    """The record as a RecordOut-shaped dict, read as plain columns (no ORM identity map)."""
+    row = (await db.execute(select(*_record_columns).where(Record.id == record_id))).first()
+    return record_to_dict(row) if row is not None else None
+
+async def list_records_page_async(
+    db: AsyncSession,
+    *,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    option_type: Optional[OptionType] = None,
+    status: Optional[StatusType] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of records (as RecordOut-shaped dicts) plus the cursor for the next page (None on the last page),
+    ordered by (created_at, id). With a cursor every page is an index seek, so page N costs the same as page 1;
+    `skip` is the offset fallback. Raises InvalidCursor.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    stmt = _list_statement(0 if after else skip, limit + 1, option_type, status, after, _record_columns)
+    return _page((await db.execute(stmt)).all(), limit)
+
+async def search_records_page_async(
+    db: AsyncSession,
+    q: str,
+    *,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    option_type: Optional[OptionType] = None,
+    status: Optional[StatusType] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Full-text search over description, most relevant first, paged by a (rank, id) cursor.
+    Raises InvalidSearchQuery / InvalidCursor.
+    """
+    match, after = _search_args(q, cursor)
+    rows = (await db.execute(_search_statement(match, limit + 1, option_type, status, after))).all()
+    return _search_page(rows, limit)
+
+async def update_record_async(db: AsyncSession, record: Record, updates: RecordUpdate) -> Record:
+    """Apply updates and persist."""
+    _apply_updates(record, updates)
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     return record
 
-def delete_record(db: Session, record: Record) -> None:
+async def delete_record_async(db: AsyncSession, record: Record) -> None:
     """Delete the record."""
-    db.delete(record)
-    db.commit()
+    await db.delete(record)
+    await db.commit()
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sqlite3
+
+from services.blob_store import BlobStore
+
+
+def _upload(store: BlobStore, name: str, data: bytes) -> str:
+    path = store.new_tmp_path(name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _refcount(store: BlobStore, sha256: str) -> int:
+    with sqlite3.connect(store.index_path) as conn:
+        return conn.execute("SELECT refcount FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()[0]
+
+
+def test_identical_uploads_share_one_blob(tmp_path):
+    async def run():
+        store = BlobStore(str(tmp_path))
+        first = await store.put(_upload(store, "a", b"pdf"), "ab" * 32, 3, "a.pdf")
+        second = await store.put(_upload(store, "b", b"pdf"), "ab" * 32, 3, "b.pdf")
+        assert first == second and os.path.exists(first)
+        assert _refcount(store, "ab" * 32) == 2
+        assert store.dedup_hits == 1
+
+    asyncio.run(run())
+
+
+def test_a_missing_file_is_restored_without_losing_references(tmp_path):
+    async def run():
+        store = BlobStore(str(tmp_path))
+        path = await store.put(_upload(store, "a", b"pdf"), "ab" * 32, 3, "a.pdf")
+        os.remove(path)
+        await store.put(_upload(store, "b", b"pdf"), "ab" * 32, 3, "b.pdf")
+        assert os.path.exists(path)
+        assert _refcount(store, "ab" * 32) == 2
+        # the first holder's release must not leave the blob unreferenced for gc
+        await store.release("ab" * 32)
+        await store.gc(max_total_bytes=0, max_age_seconds=0)
+        assert os.path.exists(path)
+
+    asyncio.run(run())
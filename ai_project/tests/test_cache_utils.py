@@ -0,0 +1,189 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import pytest
+from fastapi_cache.types import Backend
+
+from utils import cache_utils
+from utils.cache_utils import TieredBackend, _single_flight
+
+
+class FakeRedisBackend(Backend):
+    """Stands in for RedisBackend: a shared dict with per-key expiry, counting every call."""
+
+    def __init__(self):
+        self.data: Dict[str, Tuple[Optional[float], bytes]] = {}
+        self.gets = 0
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        self.gets += 1
+        deadline, value = self.data.get(key, (None, None))
+        if value is None:
+            return 0, None
+        if deadline is None:
+            return -1, value
+        if deadline <= time.monotonic():
+            del self.data[key]
+            return 0, None
+        return int(deadline - time.monotonic()), value
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        self.data[key] = (time.monotonic() + expire if expire else None, value)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        keys = [k for k in self.data if k.startswith(namespace)] if namespace else [key] if key in self.data else []
+        for k in keys:
+            del self.data[k]
+        return len(keys)
+
+
+@pytest.fixture(autouse=True)
+def clean_flights():
+    cache_utils._flights.clear()
+    cache_utils._flight_stats.update(computed=0, coalesced=0, early_refreshes=0)
+    yield
+    cache_utils._flights.clear()
+
+
+def test_local_hit_skips_remote():
+    async def run():
+        remote = FakeRedisBackend()
+        backend = TieredBackend(remote, max_entries=10, local_ttl=5)
+        await backend.set("k", b"v", 60)
+        assert await backend.get("k") == b"v"
+        assert remote.gets == 0
+        assert backend.stats()["local_hits"] == 1
+
+    asyncio.run(run())
+
+
+def test_remote_hit_is_copied_into_local_tier():
+    async def run():
+        remote = FakeRedisBackend()
+        await TieredBackend(remote, 10, 5).set("k", b"v", 60)  # written by another worker
+        backend = TieredBackend(remote, 10, 5)
+        assert await backend.get("k") == b"v"
+        assert await backend.get("k") == b"v"
+        assert await backend.get("missing") is None
+        assert remote.gets == 2
+        stats = backend.stats()
+        assert (stats["remote_hits"], stats["local_hits"], stats["misses"]) == (1, 1, 1)
+        assert stats["remote_tier"] == "FakeRedisBackend"
+
+    asyncio.run(run())
+
+
+def test_local_ttl_is_capped_only_with_a_remote_tier():
+    async def run():
+        tiered = TieredBackend(FakeRedisBackend(), 10, local_ttl=5)
+        await tiered.set("k", b"v", 600)
+        assert tiered._entries["k"][0] - time.monotonic() <= 5
+
+        memory_only = TieredBackend(None, 10, local_ttl=5)
+        await memory_only.set("k", b"v", 600)
+        assert memory_only._entries["k"][0] - time.monotonic() > 590
+
+    asyncio.run(run())
+
+
+def test_local_tier_is_a_bounded_lru():
+    async def run():
+        evicted = []
+        backend = TieredBackend(None, max_entries=2, local_ttl=5)
+        backend.on_evict = evicted.append
+        await backend.set("a", b"1", 60)
+        await backend.set("b", b"2", 60)
+        await backend.get("a")  # b is now least recently used
+        await backend.set("c", b"3", 60)
+        assert list(backend._entries) == ["a", "c"]
+        assert evicted == ["b"]
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_share_one_computation():
+    async def run():
+        calls = 0
+
+        async def compute() -> bytes:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return b"body"
+
+        results = await asyncio.gather(*(_single_flight("k", compute) for _ in range(5)))
+        assert results == [b"body"] * 5
+        assert calls == 1
+        assert cache_utils._flight_stats["computed"] == 1
+        assert cache_utils._flight_stats["coalesced"] == 4
+        assert "k" not in cache_utils._flights
+
+    asyncio.run(run())
+
+
+def test_failed_computation_reaches_every_waiter():
+    async def run():
+        async def compute() -> bytes:
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(_single_flight("k", compute) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert "k" not in cache_utils._flights
+
+    asyncio.run(run())
+
+
+def test_cancelled_leader_hands_off_to_one_waiter():
+    async def run():
+        calls = 0
+
+        async def compute() -> bytes:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return b"body-%d" % calls
+
+        leader = asyncio.create_task(_single_flight("k", compute))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(_single_flight("k", compute)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        # one waiter took over; the other two joined its computation instead of starting their own
+        assert results == [b"body-2"] * 3
+        assert calls == 2
+        assert leader.cancelled()
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_cancel_the_computation():
+    async def run():
+        async def compute() -> bytes:
+            await asyncio.sleep(0.05)
+            return b"body"
+
+        leader = asyncio.create_task(_single_flight("k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_single_flight("k", compute))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        assert await leader == b"body"
+        assert waiter.cancelled()
+
+    asyncio.run(run())
+
+
+def test_refresh_early_only_near_expiry(monkeypatch):
+    monkeypatch.setattr(cache_utils, "CACHE_XFETCH_BETA", 1.0)
+    now = time.time()
+    assert not cache_utils._refresh_early(None, 1.0)  # bare body written without the envelope
+    assert not any(cache_utils._refresh_early(now + 3600, 0.01) for _ in range(1000))
+    assert all(cache_utils._refresh_early(now - 1, 0.01) for _ in range(100))
+    monkeypatch.setattr(cache_utils, "CACHE_XFETCH_BETA", 0.0)
+    assert not cache_utils._refresh_early(now - 1, 0.01)
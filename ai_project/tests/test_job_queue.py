@@ -0,0 +1,44 @@
+import asyncio
+
+from services.job_queue import DONE, QUEUED, RUNNING, JobQueue, SQLiteJobStore
+
+
+def test_subscriber_follows_a_job_claimed_by_another_process(tmp_path):
+    async def run():
+        store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+        queue = JobQueue(1, 10, 60, store, poll_interval=0.02)
+        queue._queue = asyncio.Queue()  # no workers: the claim below is driven by hand
+        job = await queue.submit("alice", "jd", "resume")
+
+        events = []
+
+        async def subscribe():
+            async for event in queue.events(job):
+                events.append(event)
+
+        subscriber = asyncio.create_task(subscribe())
+        await asyncio.sleep(0.01)
+        assert events == [{"event": "status", "data": {"status": QUEUED}}]  # now waiting on job.changed
+
+        # a second process wins the claim, then this one's worker tries
+        assert await store.claim(job.id, "other-process", 30)
+        assert not await queue._claim(job)
+        assert queue._jobs.get(job.id) is None
+        assert (await queue.get(job.id)).status == RUNNING
+
+        assert await store.renew("other-process", 30, {job.id: "Q1"}) == []
+        for _ in range(100):
+            if len(events) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        theirs = await store.get(job.id)
+        theirs.status, theirs.result, theirs.expires_at = DONE, {"questions_and_answers": "Q1 A1"}, theirs.updated_at + 60
+        assert await store.finish(theirs, "other-process")
+
+        await asyncio.wait_for(subscriber, 2)
+        assert [e["event"] for e in events] == ["status", "status", "token", "status", DONE]
+        assert events[1]["data"] == {"status": RUNNING}
+        assert events[2]["data"] == {"response": "Q1"}
+        assert events[4]["data"]["result"] == {"questions_and_answers": "Q1 A1"}
+
+    asyncio.run(run())
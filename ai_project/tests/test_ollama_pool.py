@@ -0,0 +1,199 @@
+import asyncio
+import socket
+import time
+from contextlib import asynccontextmanager
+from typing import List
+
+import pytest
+import uvicorn
+
+from benchmarks.mock_ollama import create_app
+from services.ollama_client import OllamaPool, OllamaUnavailable
+
+TOKENS = 5
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def mock_ollama(port: int, **options):
+    """A benchmarks.mock_ollama server on `port`, streaming TOKENS tokens quickly unless told otherwise."""
+    options = {"tokens": TOKENS, "token_rate": 200.0, "first_token_ms": 10.0, "jitter": 0.0, **options}
+    server = uvicorn.Server(uvicorn.Config(create_app(**options), host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def _generate(pool: OllamaPool) -> List[str]:
+    return [token async for token in pool.stream_generate("llama3", "prompt")]
+
+
+def _by_url(pool: OllamaPool):
+    return {b.url: b for b in pool.backends}
+
+
+def test_failover_to_a_live_backend_before_the_first_token():
+    async def run():
+        dead = f"http://127.0.0.1:{_free_port()}"
+        async with mock_ollama(_free_port()) as live:
+            # equal load and latency: the dead backend, listed first, is tried first
+            pool = OllamaPool({dead: 2, live: 2}, health_interval=0)
+            try:
+                assert len(await _generate(pool)) == TOKENS
+                backends = _by_url(pool)
+                assert not backends[dead].healthy
+                assert backends[live].healthy and backends[live].generations == 1
+                assert pool.failovers == 1
+                # the dead backend gets no more work while it is marked down
+                await _generate(pool)
+                assert backends[dead].generations == 1
+                assert backends[live].generations == 2
+            finally:
+                await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_no_retry_once_a_token_was_sent():
+    async def run():
+        async with mock_ollama(_free_port(), fail_after=2) as flaky, mock_ollama(_free_port()) as live:
+            pool = OllamaPool({flaky: 2, live: 2}, health_interval=0)
+            received = []
+            try:
+                with pytest.raises(OllamaUnavailable):
+                    async for token in pool.stream_generate("llama3", "prompt"):
+                        received.append(token)
+                backends = _by_url(pool)
+                assert len(received) == 2
+                assert backends[live].generations == 0
+                assert not backends[flaky].healthy
+                assert pool.failovers == 0
+                assert all(b.in_flight == 0 for b in pool.backends)
+            finally:
+                await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_all_backends_down():
+    async def run():
+        pool = OllamaPool({f"http://127.0.0.1:{_free_port()}": 1, f"http://127.0.0.1:{_free_port()}": 1}, health_interval=0)
+        try:
+            with pytest.raises(OllamaUnavailable, match="All 2 Ollama backends failed"):
+                await _generate(pool)
+        finally:
+            await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_generations_wait_at_the_per_backend_cap():
+    async def run():
+        # 20 tokens at 100/s: each generation takes ~0.2s
+        async with mock_ollama(_free_port(), tokens=20, token_rate=100.0) as a, mock_ollama(_free_port(), tokens=20, token_rate=100.0) as b:
+            pool = OllamaPool({a: 1, b: 1}, health_interval=0)
+            peak = {a: 0, b: 0}
+
+            async def sample():
+                while True:
+                    for backend in pool.backends:
+                        peak[backend.url] = max(peak[backend.url], backend.in_flight)
+                    await asyncio.sleep(0.005)
+
+            sampler = asyncio.create_task(sample())
+            try:
+                started = time.perf_counter()
+                await asyncio.gather(*(_generate(pool) for _ in range(4)))
+                elapsed = time.perf_counter() - started
+            finally:
+                sampler.cancel()
+                await pool.aclose()
+            assert peak == {a: 1, b: 1}
+            assert [backend.generations for backend in pool.backends] == [2, 2]
+            # two rounds of two parallel generations, not four at once
+            assert elapsed >= 0.35
+
+    asyncio.run(run())
+
+
+def test_least_loaded_backend_gets_the_next_generation():
+    async def run():
+        async with mock_ollama(_free_port(), tokens=20, token_rate=100.0) as small, mock_ollama(_free_port(), tokens=20, token_rate=100.0) as big:
+            pool = OllamaPool({small: 1, big: 3}, health_interval=0)
+            try:
+                await asyncio.gather(*(_generate(pool) for _ in range(4)))
+                backends = _by_url(pool)
+                # load is in flight / cap, so the bigger backend takes three of the four concurrent generations
+                assert (backends[small].generations, backends[big].generations) == (1, 3)
+            finally:
+                await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_probe_brings_a_backend_back():
+    async def run():
+        port = _free_port()
+        down = f"http://127.0.0.1:{port}"
+        async with mock_ollama(_free_port()) as live:
+            pool = OllamaPool({down: 1, live: 1}, health_interval=0.05)
+            try:
+                await _generate(pool)  # starts the probes; the first attempt fails over
+                backend = _by_url(pool)[down]
+                assert not backend.healthy
+                async with mock_ollama(port):
+                    for _ in range(100):
+                        if backend.healthy:
+                            break
+                        await asyncio.sleep(0.02)
+                    assert backend.healthy and backend.last_error is None
+                    assert backend.latency > 0
+                    # cap 1 each: two concurrent generations need both backends
+                    await asyncio.gather(_generate(pool), _generate(pool))
+                    assert backend.generations == 2  # the failed attempt, then work again after recovery
+            finally:
+                await pool.aclose()
+
+    asyncio.run(run())
+
+
+def test_an_unexpected_probe_error_does_not_stop_the_probes():
+    async def run():
+        port = _free_port()
+        down = f"http://127.0.0.1:{port}"
+        async with mock_ollama(_free_port()) as live:
+            pool = OllamaPool({down: 1, live: 1}, health_interval=0.05)
+            broken = _by_url(pool)[live]
+            real_probe = broken.client.probe
+
+            async def probe():
+                raise RuntimeError("client has been closed")
+
+            broken.client.probe = probe
+            try:
+                await _generate(pool)  # starts the probes; the dead backend fails over to the live one
+                backend = _by_url(pool)[down]
+                await asyncio.sleep(0.15)
+                assert not pool._probe_task.done()
+                assert not broken.healthy and broken.last_error == "client has been closed"
+                broken.client.probe = real_probe
+                async with mock_ollama(port):
+                    for _ in range(100):
+                        if backend.healthy and broken.healthy:
+                            break
+                        await asyncio.sleep(0.02)
+                    assert backend.healthy and broken.healthy
+            finally:
+                await pool.aclose()
+
+    asyncio.run(run())
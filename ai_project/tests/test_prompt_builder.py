@@ -0,0 +1,31 @@
+from config import CHARS_PER_TOKEN
+from services.prompt_builder import JD_SECTION_PRIORITY, RESUME_SECTION_PRIORITY, estimate_tokens, fit_to_budget
+
+
+def test_a_document_that_fits_is_unchanged():
+    text = "SKILLS\nPython, SQL\nEDUCATION\nBSc"
+    assert fit_to_budget(text, 100, RESUME_SECTION_PRIORITY) == text
+
+
+def test_whole_sections_are_kept_by_priority_in_document_order():
+    text = "EDUCATION\n" + "school " * 20 + "\nSKILLS\nPython, SQL"
+    fitted = fit_to_budget(text, 10, RESUME_SECTION_PRIORITY)
+    assert fitted == "SKILLS\nPython, SQL"
+
+
+def test_a_single_long_line_is_cut_to_the_budget():
+    text = " ".join(f"word{i}" for i in range(2000))  # one extracted line, no section breaks
+    fitted = fit_to_budget(text, 100, JD_SECTION_PRIORITY)
+    assert fitted
+    assert text.startswith(fitted)
+    assert estimate_tokens(fitted) + 1 <= 100
+    assert len(fitted) > 90 * CHARS_PER_TOKEN
+    assert fitted.split()[-1] == text.split()[len(fitted.split()) - 1]  # ends on a whole word
+
+
+def test_a_heading_keeps_a_cut_body_line():
+    text = "SKILLS\n" + "python " * 500
+    fitted = fit_to_budget(text, 50, RESUME_SECTION_PRIORITY)
+    heading, body = fitted.split("\n")
+    assert heading == "SKILLS" and body.startswith("python python")
+    assert estimate_tokens(fitted) <= 50
@@ -1,16 +1,479 @@
+import asyncio
+import base64
+import hashlib
+import inspect
+import math
+import random
+import struct
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
 from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
-from fastapi_cache.backends.redis import RedisBackend
+from fastapi_cache.types import Backend
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import (
+    CACHE_BACKEND,
+    REDIS_URL,
+    CACHE_LOCAL_MAX_ENTRIES,
+    CACHE_LOCAL_TTL_SECONDS,
+    CACHE_XFETCH_BETA,
+    CACHE_INVALIDATION_REPLAY_SECONDS,
+)
+from database import ThreadedSession
+from utils.json_utils import JSONBytesResponse, dumps
+from utils.logger import logger
+from utils.metrics import CallbackMetric
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+class MemoryTagIndex:
+    """
+    tag -> cache keys, kept in process next to the in-process cache tier. The tier reports every
+    key it drops (LRU eviction, expiry, clear) through discard(), so the index stays as bounded as
+    the cache; keys tagged but never stored (the handler raised) are swept once they expire.
+    """
+
+    SWEEP_INTERVAL_SECONDS = 60
+
+    def __init__(self):
+        self._tags: Dict[str, set] = {}
+        self._keys: Dict[str, Tuple[float, set]] = {}  # key -> (expiry timestamp, its tags)
+        self._next_sweep = 0.0
+
+    async def add(self, tags: Iterable[str], key: str, expire: int) -> None:
+        now = time.time()
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.SWEEP_INTERVAL_SECONDS
+            for stale in [k for k, (deadline, _) in self._keys.items() if deadline < now]:
+                self.discard(stale)
+        key_tags = self._keys[key][1] if key in self._keys else set()
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+            key_tags.add(tag)
+        self._keys[key] = (now + expire, key_tags)
+
+    def discard(self, key: str) -> None:
+        """Forget `key`, e.g. because the cache tier evicted it."""
+        _, key_tags = self._keys.pop(key, (0.0, ()))
+        for tag in key_tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def pop_keys(self, tags: Iterable[str]) -> List[str]:
+        keys = set()
+        for tag in tags:
+            keys.update(self._tags.get(tag, ()))
+        for key in keys:
+            self.discard(key)
+        return list(keys)
+
+
+class RedisTagIndex:
+    """Tags stored as Redis sets next to the cached entries, so every worker process sees the same index."""
+
+    def __init__(self, redis: "Redis", prefix: str):
+        self.redis = redis
+        self.prefix = prefix
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def add(self, tags: Iterable[str], key: str, expire: int) -> None:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), key)
+                # every key in a tag shares the route TTL, so the set never needs to outlive the newest one
+                pipe.expire(self._tag_key(tag), expire)
+            await pipe.execute()
+
+    async def pop_keys(self, tags: Iterable[str]) -> List[str]:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            pipe.delete(*tag_keys)
+            *members, _ = await pipe.execute()
+        keys = set()
+        for member in members:
+            keys.update(k.decode() if isinstance(k, bytes) else k for k in member)
+        return list(keys)
+
+
+class TieredBackend(Backend):
+    """
+    fastapi_cache backend: a bounded in-process LRU (local tier) in front of an optional shared
+    backend (remote tier, Redis). Local hits cost no network hop; remote hits are copied into the
+    LRU for at most `local_ttl` seconds, since another worker's eviction can't reach this process.
+    """
+
+    def __init__(self, remote: Optional[Backend], max_entries: int, local_ttl: int):
+        self.remote = remote
+        self.max_entries = max_entries
+        self.local_ttl = local_ttl
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        # called with every key the local tier drops; memory mode points it at the tag index
+        self.on_evict: Optional[Callable[[str], None]] = None
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    def _local_get(self, key: str) -> Optional[Tuple[float, bytes]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            self._evicted(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _evicted(self, key: str) -> None:
+        if self.on_evict is not None:
+            self.on_evict(key)
+
+    def _remember(self, key: str, value: bytes, ttl: float) -> None:
+        if ttl <= 0 or self.max_entries <= 0:
+            self._evicted(key)
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._evicted(self._entries.popitem(last=False)[0])
+
+    def _local_ttl(self, expire: Optional[int]) -> float:
+        # the LRU is the only copy in memory mode, so it keeps the full TTL there
+        if self.remote is None:
+            return expire or 0
+        return min(expire, self.local_ttl) if expire else self.local_ttl
+
+    async def get_with_ttl(self, key: str) -> Tuple[int, Optional[bytes]]:
+        entry = self._local_get(key)
+        if entry is not None:
+            self.local_hits += 1
+            return int(entry[0] - time.monotonic()), entry[1]
+        if self.remote is not None:
+            ttl, value = await self.remote.get_with_ttl(key)
+            if value is not None:
+                self.remote_hits += 1
+                # Redis reports -1 for a key without expiry
+                self._remember(key, value, self._local_ttl(ttl if ttl > 0 else None))
+                return ttl, value
+        self.misses += 1
+        return 0, None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return (await self.get_with_ttl(key))[1]
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        self._remember(key, value, self._local_ttl(expire))
+        if self.remote is not None:
+            await self.remote.set(key, value, expire)
+
+    async def clear(self, namespace: Optional[str] = None, key: Optional[str] = None) -> int:
+        if namespace:
+            local = [k for k in self._entries if k.startswith(namespace)]
+        else:
+            local = [key] if key in self._entries else []
+        for k in local:
+            del self._entries[k]
+            self._evicted(k)
+        if self.remote is not None:
+            return await self.remote.clear(namespace, key)
+        return len(local)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "local_hit_ratio": round(self.local_hits / lookups, 4) if lookups else 0.0,
+            "remote_hit_ratio": round(self.remote_hits / lookups, 4) if lookups else 0.0,
+            "hit_ratio": round((self.local_hits + self.remote_hits) / lookups, 4) if lookups else 0.0,
+            "remote_tier": type(self.remote).__name__ if self.remote is not None else "none",
+        }
+
+
+_tag_index = None
+_replays = set()
+# cache_json_response: one in-flight computation per key, awaited by concurrent misses on the same key
+_flights: Dict[str, "asyncio.Future[bytes]"] = {}
+_flight_stats = {"computed": 0, "coalesced": 0, "early_refreshes": 0}
+# entries written by cache_json_response carry (expires_at, compute seconds) ahead of the body for XFetch;
+# the leading NUL can't start a JSON document, so bare bodies stored by older code still read back as-is
+_ENVELOPE = struct.Struct("!cdd")
+_ENVELOPE_MARK = b"\x00"
+_UNKEYED_TYPES = (Session, AsyncSession, ThreadedSession, Request, Response)
 
-from config import CACHE_BACKEND, REDIS_URL
 
 def init_cache(app):
     """
     Initialize cache backend.
-    - CACHE_BACKEND == "memory" -> in-memory backend
-    - CACHE_BACKEND == "redis"  -> redis backend (requires aioredis package)
+    - CACHE_BACKEND == "memory" -> bounded in-process LRU
+    - CACHE_BACKEND == "redis"  -> the same LRU in front of redis (requires redis package)
     """
+    global _tag_index
+    prefix = "fastapi-cache"
     if CACHE_BACKEND == "redis":
-        FastAPICache.init(RedisBackend(REDIS_URL), prefix="fastapi-cache")
+        # the redis client is only imported when it is configured
+        from fastapi_cache.backends.redis import RedisBackend
+        from redis.asyncio import Redis
+
+        redis = Redis.from_url(REDIS_URL)
+        backend = TieredBackend(RedisBackend(redis), CACHE_LOCAL_MAX_ENTRIES, CACHE_LOCAL_TTL_SECONDS)
+        _tag_index = RedisTagIndex(redis, prefix)
+    else:
+        backend = TieredBackend(None, CACHE_LOCAL_MAX_ENTRIES, CACHE_LOCAL_TTL_SECONDS)
+        _tag_index = MemoryTagIndex()
+        backend.on_evict = _forget_evicted
+    FastAPICache.init(backend, prefix=prefix, key_builder=request_key_builder)
+
+
+def _forget_evicted(key: str) -> None:
+    # memory mode: the LRU is the only copy, so a key it drops is gone and its tags can go too,
+    # unless a recomputation already re-tagged the key and is about to store it again
+    if key not in _flights:
+        _tag_index.discard(key)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Per-tier hit ratios of the response cache, plus miss coalescing and early refresh counters."""
+    backend = FastAPICache.get_backend()
+    stats = backend.stats() if isinstance(backend, TieredBackend) else {}
+    return {**stats, **_flight_stats, "in_flight": len(_flights)}
+
+
+def _cache_lookups() -> Dict[Tuple[str, ...], float]:
+    stats = cache_stats()
+    return {(tier,): stats.get(field, 0) for tier, field in (("local", "local_hits"), ("remote", "remote_hits"), ("miss", "misses"))}
+
+
+CallbackMetric("cache_lookups_total", "Response cache lookups by the tier that answered", ("tier",), _cache_lookups, "counter")
+CallbackMetric("cache_local_entries", "Entries held in the in-process cache tier", (), lambda: {(): cache_stats().get("entries", 0)})
+CallbackMetric(
+    "cache_misses_coalesced_total", "Cache misses that awaited another request's computation", (),
+    lambda: {(): _flight_stats["coalesced"]}, "counter",
+)
+CallbackMetric(
+    "cache_early_refreshes_total", "Hits recomputed ahead of expiry (XFetch)", (),
+    lambda: {(): _flight_stats["early_refreshes"]}, "counter",
+)
+
+
+def _build_key(func: Callable[..., Any], namespace: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+    # DB sessions, requests and responses differ on every call; keying on them means the cache never hits
+    keyed = sorted((k, v) for k, v in kwargs.items() if not isinstance(v, _UNKEYED_TYPES))
+    digest = hashlib.md5(f"{func.__module__}:{func.__name__}:{args}:{keyed}".encode()).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def request_key_builder(
+    func: Callable[..., Any],
+    namespace: str = "",
+    *,
+    request: Optional[Request] = None,
+    response: Optional[Response] = None,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+) -> str:
+    """Like fastapi_cache's default key builder, but ignores Session/Request/Response arguments."""
+    return _build_key(func, namespace, args, kwargs)
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag: the SHA-256 of the exact response bytes, identical in every worker process."""
+    return '"%s"' % base64.urlsafe_b64encode(hashlib.sha256(body).digest()).rstrip(b"=").decode("ascii")
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison (RFC 9110), so a W/ prefix sent back by a proxy still matches."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _conditional_response(request: Request, body: bytes, headers: Dict[str, str]) -> Response:
+    # clients may keep the body but must revalidate: entries are evicted on write, not by age
+    etag = etag_for(body)
+    headers = {**headers, "ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONBytesResponse(body, headers=headers)
+
+
+def _unwrap(raw: bytes) -> Tuple[bytes, Optional[float], float]:
+    """Split a stored entry into (body, expires_at, compute seconds); bare bodies have no expiry info."""
+    if raw[:1] != _ENVELOPE_MARK or len(raw) < _ENVELOPE.size:
+        return raw, None, 0.0
+    _, expires_at, delta = _ENVELOPE.unpack_from(raw)
+    return raw[_ENVELOPE.size:], expires_at, delta
+
+
+def _refresh_early(expires_at: Optional[float], delta: float) -> bool:
+    """
+    XFetch: treat a hit as a miss with a probability that grows as expiry nears and with how long
+    the value took to compute, so one request refreshes a hot entry before it expires for everyone.
+    """
+    if expires_at is None or CACHE_XFETCH_BETA <= 0:
+        return False
+    return time.time() - delta * CACHE_XFETCH_BETA * math.log(1.0 - random.random()) >= expires_at
+
+
+async def _single_flight(key: str, compute: Callable[[], Any]) -> bytes:
+    """Run `compute` once per key at a time; concurrent callers for the same key await that result."""
+    coalesced = False
+    while key in _flights:
+        flight = _flights[key]
+        if not coalesced:
+            _flight_stats["coalesced"] += 1
+            coalesced = True
+        try:
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if not flight.cancelled():
+                raise
+            # the request computing it went away: the first waiter to wake computes it, the others join that one
+
+    flight = asyncio.get_running_loop().create_future()
+    _flights[key] = flight
+    _flight_stats["computed"] += 1
+    try:
+        body = await compute()
+    except asyncio.CancelledError:
+        flight.cancel()
+        raise
+    except Exception as e:
+        flight.set_exception(e)
+        flight.exception()  # retrieved here, so asyncio doesn't warn when nobody was waiting
+        raise
     else:
-        FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
+        flight.set_result(body)
+        return body
+    finally:
+        if _flights.get(key) is flight:
+            del _flights[key]
+
+
+async def _tag(tags: Optional[Callable[..., Iterable[str]]], kwargs: Dict[str, Any], key: str, expire: int) -> None:
+    if tags is None or _tag_index is None:
+        return
+    try:
+        await _tag_index.add(tags(**kwargs), key, expire)
+    except Exception:
+        logger.warning(f"Could not tag cache key {key}", exc_info=True)
+
+
+def cache_json_response(expire: int, namespace: str = "", tags: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    Cache decorator for async endpoints that return plain JSON-serializable data (e.g. dicts projected
+    from DB rows). The result is encoded once with utils.json_utils.dumps and those bytes are what get
+    cached and served: a hit is a backend read and nothing else, no decode, no response_model validation.
+    With `tags`, the key is filed under `tags(**endpoint_kwargs)` so invalidate_tags() can evict it after a write.
+    Concurrent misses on one key share a single computation, and hot entries are refreshed shortly
+    before they expire (XFetch, CACHE_XFETCH_BETA) instead of all expiring under load at once.
+    Responses carry a strong ETag; a matching `If-None-Match` gets a bodiless 304, straight from the
+    cache on a hit, so a client polling unchanged data costs neither a DB query nor a download.
+    Honors `Cache-Control: no-store` (bypass) and `no-cache` (refresh), like fastapi_cache's @cache.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        request_name = next((p.name for p in signature.parameters.values() if p.annotation is Request), None)
+        injected = request_name is None
+        if injected:
+            request_name = "__cache_request"
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs.pop(request_name) if injected else kwargs[request_name]
+            cache_control = request.headers.get("cache-control")
+            if not FastAPICache.get_enable() or cache_control == "no-store":
+                return _conditional_response(request, dumps(await func(*args, **kwargs)), {})
+
+            key = _build_key(func, f"{FastAPICache.get_prefix()}:{namespace}", args, kwargs)
+            backend = FastAPICache.get_backend()
+            status_header = FastAPICache.get_cache_status_header()
+            if cache_control != "no-cache":
+                try:
+                    cached = await backend.get(key)
+                except Exception:
+                    logger.warning(f"Error reading cache key {key}", exc_info=True)
+                    cached = None
+                if cached is not None:
+                    body, expires_at, delta = _unwrap(cached)
+                    if not _refresh_early(expires_at, delta):
+                        return _conditional_response(request, body, {status_header: "HIT"})
+                    _flight_stats["early_refreshes"] += 1
+
+            async def compute() -> bytes:
+                # tag before reading the DB so a write that lands meanwhile still finds (and evicts) this key
+                await _tag(tags, kwargs, key, expire)
+                started = time.perf_counter()
+                body = dumps(await func(*args, **kwargs))
+                envelope = _ENVELOPE.pack(_ENVELOPE_MARK, time.time() + expire, time.perf_counter() - started)
+                try:
+                    await backend.set(key, envelope + body, expire)
+                except Exception:
+                    logger.warning(f"Error setting cache key {key}", exc_info=True)
+                return body
+
+            body = await _single_flight(key, compute)
+            return _conditional_response(request, body, {status_header: "MISS"})
+
+        if injected:
+            request_param = inspect.Parameter(request_name, inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+            wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request_param])
+        return wrapper
+
+    return decorator
+
+
+async def _evict(keys: List[str]) -> None:
+    backend = FastAPICache.get_backend()
+    for key in keys:
+        await backend.clear(key=key)
+
+
+async def _replay_eviction(keys: List[str], tags: List[str]) -> None:
+    await asyncio.sleep(CACHE_INVALIDATION_REPLAY_SECONDS)
+    try:
+        await _evict(keys + await _tag_index.pop_keys(tags))
+    except Exception:
+        logger.warning(f"Delayed cache invalidation failed for {tags}", exc_info=True)
+
+
+async def invalidate_tags(*tags: str) -> int:
+    """
+    Evict every cached response filed under any of `tags`. Returns the number of keys evicted.
+    The eviction is repeated once after CACHE_INVALIDATION_REPLAY_SECONDS to catch a read that
+    loaded the old rows before the write committed and stored them just after this call.
+    """
+    if _tag_index is None or not tags:
+        return 0
+    tags_list = list(tags)
+    try:
+        keys = await _tag_index.pop_keys(tags_list)
+        await _evict(keys)
+    except Exception:
+        logger.warning(f"Cache invalidation failed for {tags_list}", exc_info=True)
+        return 0
+    if CACHE_INVALIDATION_REPLAY_SECONDS > 0:
+        task = asyncio.create_task(_replay_eviction(keys, tags_list))
+        _replays.add(task)
+        task.add_done_callback(_replays.discard)
+    return len(keys)
@@ -0,0 +1,47 @@
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def dumps(value: Any) -> bytes:
+        """Encode to compact JSON bytes (orjson; handles datetime and Enum natively)."""
+        return orjson.dumps(value, default=_default)
+
+    loads = orjson.loads
+
+else:
+
+    def dumps(value: Any) -> bytes:
+        """Encode to compact JSON bytes (stdlib fallback when orjson is not installed)."""
+        return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    loads = json.loads
+
+
+class JSONBytesResponse(Response):
+    """JSON response for content that is already encoded bytes, or anything `dumps` can encode."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
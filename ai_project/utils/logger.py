@@ -1,6 +1,9 @@
+import atexit
 import logging
+import queue
 import sys
-from typing import Dict, Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
 
 from config import LOG_LEVEL
 
@@ -14,15 +17,33 @@ formatter = logging.Formatter(
     "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
 )
 handler.setFormatter(formatter)
-logger.addHandler(handler)
-
-
-def mask_sensitive(data: Dict[str, Any]) -> Dict[str, Any]:
-    """Utility to mask sensitive information in logs."""
-    masked = {}
-    for k, v in data.items():
-        if k.lower() in ("password", "authorization", "token", "access_token"):
-            masked[k] = "***REDACTED***"
-        else:
-            masked[k] = v
-    return masked
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """Hands records to the listener thread as-is; formatting and the stdout write happen off the request path."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_listener = QueueListener(_log_queue, handler, respect_handler_level=True)
+_listener.start()
+atexit.register(_listener.stop)
+
+logger.addHandler(_InProcessQueueHandler(_log_queue))
+
+SENSITIVE_KEYS = frozenset(("password", "authorization", "token", "access_token", "refresh_token", "cookie", "secret"))
+REDACTED = "***REDACTED***"
+
+
+def mask_sensitive(data: Any) -> Any:
+    """Utility to mask sensitive information in logs (recurses into nested dicts and lists)."""
+    if isinstance(data, dict):
+        return {
+            k: REDACTED if isinstance(k, str) and k.lower() in SENSITIVE_KEYS else mask_sensitive(v)
+            for k, v in data.items()
+        }
+    if isinstance(data, (list, tuple)):
+        return [mask_sensitive(v) for v in data]
+    return data
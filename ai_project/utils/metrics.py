@@ -0,0 +1,204 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from utils.logger import logger
+
+# Prometheus text exposition (format 0.0.4), kept in process: every worker serves its own numbers
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+THROUGHPUT_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+_INF_LABEL = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        registry.register(self)
+
+    def labels(self, *values: str):
+        """Child series for one combination of label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self) -> Iterable[str]:
+        for values, child in self._children.items():
+            cumulative = 0
+            # per-bucket counts are stored; Prometheus wants running totals
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.labelnames, values, _INF_LABEL)} {child.count}"
+            yield f"{self.name}_sum{_labels(self.labelnames, values)} {_number(child.sum)}"
+            yield f"{self.name}_count{_labels(self.labelnames, values)} {child.count}"
+
+
+class CallbackMetric(_Metric):
+    """
+    Values read from `collect()` at scrape time: {label values tuple: number}. Used to expose
+    counters the services already keep (cache and queue stats) without touching their hot paths.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], collect: Callable[[], Dict[Tuple[str, ...], float]], kind: str = "gauge"):
+        self.collect = collect
+        self.kind = kind
+        super().__init__(name, help, labelnames)
+
+    def _samples(self) -> Iterable[str]:
+        for values, value in self.collect().items():
+            yield f"{self.name}{_labels(self.labelnames, values)} {_number(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # one broken collector must not take the whole scrape down
+                logger.warning(f"Could not collect metric {metric.name}", exc_info=True)
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# -------------------- Application metrics --------------------
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status")
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time by statement type", ("engine", "statement"), DB_BUCKETS
+)
+pdf_extract_duration = Histogram(
+    "pdf_extract_duration_seconds", "PDF text extraction time (cache misses only)", (), LLM_BUCKETS
+)
+llm_time_to_first_token = Histogram(
+    "llm_time_to_first_token_seconds", "Time from sending a generation to Ollama until its first token", ("model",), LLM_BUCKETS
+)
+llm_generation_duration = Histogram(
+    "llm_generation_duration_seconds", "Ollama generation wall time, request sent to last token", ("model", "outcome"), LLM_BUCKETS
+)
+llm_admission_wait = Histogram(
+    "llm_admission_wait_seconds", "Time a generation waited for an admission slot", ("outcome",), LLM_BUCKETS
+)
+llm_admission_rejected = Counter(
+    "llm_admission_rejected_total", "Generations refused by admission control (429/503)", ("reason",)
+)
+llm_tokens = Counter("llm_tokens_total", "Tokens streamed back from Ollama", ("model",))
+llm_tokens_per_second = Histogram(
+    "llm_tokens_per_second", "Per-generation decode throughput after the first token", ("model",), THROUGHPUT_BUCKETS
+)
@@ -1,9 +1,127 @@
-from pypdf import PdfReader
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, List, Optional, Union
+
+from config import PDF_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_TEXT_CACHE_ENTRIES
+from utils.metrics import pdf_extract_duration
+
+_executor: Optional[ProcessPoolExecutor] = None
+_text_cache: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _join_pages(pages: List[str]) -> str:
+    return "\n".join(pages)
+
+
+def _pdf_reader(source):
+    # pypdf is only needed where PDFs get parsed (mostly the pool workers), so API workers boot without it
+    from pypdf import PdfReader
+
+    return PdfReader(source)
+
+
+def _extract_page_range(data: bytes, start: int, stop: int) -> List[str]:
+    """Worker: extract text of pages [start, stop) from raw PDF bytes."""
+    reader = _pdf_reader(io.BytesIO(data))
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _extract_small_or_count(data: bytes, max_pages: int) -> Union[str, int]:
+    """
+    Worker: extract the whole document if it has fewer than `max_pages` pages,
+    otherwise return the page count so the caller can fan the pages out.
+    """
+    reader = _pdf_reader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    if page_count >= max_pages:
+        return page_count
+    return _join_pages([page.extract_text() or "" for page in reader.pages])
+
+
+def get_pdf_executor() -> ProcessPoolExecutor:
+    """Process pool used for PDF parsing, created on first use."""
+    global _executor
+    if _executor is None:
+        # spawn: never fork a process that is already running the event loop and threadpool
+        _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown_pdf_executor() -> None:
+    """Stop the PDF worker processes (call at shutdown)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _cache_get(key: str) -> Optional[str]:
+    text = _text_cache.get(key)
+    if text is not None:
+        _text_cache.move_to_end(key)
+    return text
+
+
+def _cache_put(key: str, text: str) -> None:
+    _text_cache[key] = text
+    _text_cache.move_to_end(key)
+    while len(_text_cache) > PDF_TEXT_CACHE_ENTRIES:
+        _text_cache.popitem(last=False)
+
+
+def _read_source(source: Union[str, BinaryIO]) -> bytes:
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            return f.read()
+    source.seek(0)
+    return source.read()
+
 
 def extract_text_from_pdf(file_path: str) -> str:
-    """Extract all text from a PDF file."""
-    reader = PdfReader(file_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
+    """Extract all text from a PDF file (synchronous, in the calling process)."""
+    reader = _pdf_reader(file_path)
+    return _join_pages([page.extract_text() or "" for page in reader.pages])
+
+
+async def extract_text_from_pdf_async(source: Union[str, BinaryIO], content_hash: Optional[str] = None) -> str:
+    """
+    Extract all text from a PDF (path or binary file object) without blocking the event loop.
+    Parsing runs in the process pool; large documents are split into page ranges
+    extracted in parallel. Results are cached by the sha256 of the file content;
+    pass `content_hash` when it is already known to skip reading cached documents.
+    """
+    if content_hash is not None:
+        cached = _cache_get(content_hash)
+        if cached is not None:
+            return cached
+
+    loop = asyncio.get_running_loop()
+    data = await loop.run_in_executor(None, _read_source, source)
+    if content_hash is None:
+        content_hash = hashlib.sha256(data).hexdigest()
+        cached = _cache_get(content_hash)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    executor = get_pdf_executor()
+    result = await loop.run_in_executor(executor, _extract_small_or_count, data, PDF_PARALLEL_MIN_PAGES)
+    if isinstance(result, str):
+        text = result
+    else:
+        page_count = result
+        step = -(-page_count // PDF_WORKERS)
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(executor, _extract_page_range, data, start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ))
+        text = _join_pages([page for chunk in chunks for page in chunk])
+
+    pdf_extract_duration.observe(time.perf_counter() - started)
+    _cache_put(content_hash, text)
     return text
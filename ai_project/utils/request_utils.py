@@ -0,0 +1,59 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable
+
+from fastapi import HTTPException, Request
+
+# Non-standard status (nginx convention) for "client closed request"
+CLIENT_CLOSED_REQUEST = 499
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+async def run_until_disconnect(request: Request, awaitable: Awaitable[Any], poll_interval: float = 0.5) -> Any:
+    """
+    Await `awaitable` while watching the client connection.
+    If the client goes away first, the work is cancelled instead of running to completion.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def iter_json_items(request: Request, key: str) -> AsyncIterator[Any]:
+    """
+    Yield the items of a JSON request body, either `{key: [...]}` / a bare list, or NDJSON
+    (one item per line), which is read incrementally so large bodies are never held in memory.
+    NDJSON lines are yielded as raw bytes; the caller decodes them so one bad line fails only itself.
+    """
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON")
+    items = body.get(key) if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail=f"Expected a list or an object with a '{key}' list")
+    for item in items:
+        yield item
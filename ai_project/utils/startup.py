@@ -0,0 +1,70 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from utils.logger import logger
+
+
+def _process_age_ms() -> Optional[float]:
+    """Milliseconds since this process was started, interpreter boot included (Linux /proc only)."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return round((uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000, 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupReport:
+    """Wall time of each worker boot phase: the import groups in main.py, then every startup step."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.ready_at_ms: Optional[float] = None
+        self.target_ms: Optional[float] = None
+
+    def record(self, name: str, started: float) -> float:
+        """Record the phase that began at `started`; returns now, the start of the next phase."""
+        now = time.perf_counter()
+        self.phases[name] = round((now - started) * 1000, 2)
+        return now
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def _total(self, prefix: str) -> float:
+        return round(sum(ms for name, ms in self.phases.items() if name.startswith(prefix)), 2)
+
+    def finish(self, target_ms: float) -> None:
+        """Log the breakdown once startup is complete, with a warning when boot took longer than `target_ms`."""
+        self.target_ms = target_ms
+        self.ready_at_ms = _process_age_ms()
+        report = self.as_dict()
+        logger.info(f"Startup: {report['boot_ms']} ms to ready, phases (ms): {self.phases}")
+        if not report["within_target"]:
+            slowest = sorted(self.phases.items(), key=lambda item: item[1], reverse=True)[:3]
+            logger.warning(f"Startup took {report['boot_ms']} ms, over the {target_ms:.0f} ms target; slowest: {slowest}")
+
+    def as_dict(self) -> Dict[str, Any]:
+        measured = self._total("import:") + self._total("init:")
+        # process age covers interpreter start and uvicorn too; fall back to what main.py measured
+        boot_ms = self.ready_at_ms if self.ready_at_ms is not None else measured
+        return {
+            "boot_ms": boot_ms,
+            "imports_ms": self._total("import:"),
+            "init_ms": self._total("init:"),
+            "phases_ms": dict(self.phases),
+            "target_ms": self.target_ms,
+            "within_target": self.target_ms is None or boot_ms <= self.target_ms,
+        }
+
+
+startup_report = StartupReport()